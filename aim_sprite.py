@@ -1,20 +1,38 @@
 import pygame
+from typing import TYPE_CHECKING
 
 from sprite import Sprite
 
+if TYPE_CHECKING:
+    from game import Game
+
 class AimSprite(Sprite):
     LENGTH = 80
 
-    def __init__(self, color: tuple[int, int, int], origin: tuple[int, int]):
-        self._orig_image = pygame.surface.Surface((AimSprite.LENGTH, 3))
-        self._orig_image.fill((0, 0, 0))
-        self._orig_image.set_colorkey((0, 0, 0))
-        pygame.draw.line(self._orig_image, color, (0, 1), (AimSprite.LENGTH - 1, 1))
+    def __init__(self, game: 'Game', color: tuple[int, int, int], origin: tuple[int, int]):
+        self._rotation_cache = game.resource_loader.rotation_cache
+
+        # the line is shared by every aim sprite of the same colour so its rotations are cached once
+        key = ('aim', tuple(color), AimSprite.LENGTH)
+        image = game.resource_loader.derived_images.get(key)
+        if image is None:
+            image = AimSprite._create_image(color, AimSprite.LENGTH)
+            game.resource_loader.derived_images.put(key, image)
+
+        self._orig_image = image
         super().__init__(self._orig_image)
 
         self._origin = origin
         self.angle = 90.0
 
+    @staticmethod
+    def _create_image(color: tuple[int, int, int], length: int) -> pygame.surface.Surface:
+        image = pygame.surface.Surface((length, 3))
+        image.fill((0, 0, 0))
+        image.set_colorkey((0, 0, 0))
+        pygame.draw.line(image, color, (0, 1), (length - 1, 1))
+        return image
+
     @property
     def angle(self) -> float:
         return self._angle
@@ -23,7 +41,7 @@ class AimSprite(Sprite):
     def angle(self, new_angle: float) -> None:
         self._angle = new_angle % 360.0
 
-        self.image = pygame.transform.rotate(self._orig_image, new_angle)
+        self.image = self._rotation_cache.rotate(self._orig_image, new_angle)
         self.rect = self.image.get_rect()
         self._update_position()
 
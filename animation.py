@@ -5,10 +5,14 @@ from sprite import Sprite
 
 if TYPE_CHECKING:
     from game import Game
+    from pool import Pool
 
 class Animation(Sprite):
-    def __init__(self, images: list[pygame.surface.Surface], period: int = -1, loop: bool = False):
+    # pooled animations are released back to their pool when they finish
+    def __init__(self, game: 'Game', images: list[pygame.surface.Surface], period: int = -1, loop: bool = False, pool: 'Pool[Animation]|None' = None):
         super().__init__(images[0])
+        self._rotation_cache = game.resource_loader.rotation_cache
+        self._pool = pool
         self._images: list[pygame.surface.Surface] = []
         self._angle = 0.0
         self.set_images(images, period, loop)
@@ -16,7 +20,7 @@ class Animation(Sprite):
     def _rotate_images(self) -> None:
         self._images.clear()
         for image in self._orig_images:
-            rotated_image = pygame.transform.rotate(image, self._angle)
+            rotated_image = self._rotation_cache.rotate(image, self._angle)
             self._images.append(rotated_image)
 
     @property
@@ -35,19 +39,21 @@ class Animation(Sprite):
         self._period = period
         self._loop = loop
         if self._period >= 0:
-            self._next_change = pygame.time.get_ticks() + self._period
+            self._change_timer = self._period / 1000
 
         self.image = self._images[self._index]
 
     @override
     def update(self, game: 'Game') -> None:
         if self._period >= 0:
-            current_time = pygame.time.get_ticks()
-            if current_time >= self._next_change:
+            self._change_timer -= game.frame_time
+            if self._change_timer <= 0.0:
                 self._index += 1
                 if self._index >= len(self._images):
                     if not self._loop:
                         self.kill()
+                        if self._pool is not None:
+                            self._pool.release(self)
                         return
                     self._index = 0
 
@@ -55,7 +61,7 @@ class Animation(Sprite):
                 self.image = self._images[self._index]
                 self.rect.center = old_center
                 self.dirty = 1
-                self._next_change += self._period
+                self._change_timer += self._period / 1000
 
 class ShipExplosionAnimation(Animation):
     def __init__(self, game: 'Game', center: tuple[int, int]):
@@ -63,7 +69,7 @@ class ShipExplosionAnimation(Animation):
             game.resource_loader.load_image(f'explosion{i+1}.png')
             for i in range(8)
         ]
-        super().__init__(explosion_images, 62)
+        super().__init__(game, explosion_images, 62)
         self.rect.center = center
 
         game.flight_view_sprites.add(self)
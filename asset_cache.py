@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+import pygame
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+def surface_bytes(surface: pygame.surface.Surface) -> int:
+    # subsurfaces (e.g. images from the texture atlas) share the pixels of their parent
+    if surface.get_parent() is not None:
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+def mask_bytes(mask: pygame.mask.Mask) -> int:
+    width, height = mask.get_size()
+    return (width * height + 7) // 8
+
+def sound_bytes(sound: pygame.mixer.Sound) -> int:
+    mixer_init = pygame.mixer.get_init()
+    if mixer_init is None:
+        return 0
+
+    # sounds are stored decoded in the mixer's format, which is what get_length() is based on
+    frequency, sample_format, channels = mixer_init
+    return round(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+
+# Keeps track of how much memory a set of assets uses and how often they're looked up.
+# With a budget, the least recently used entries are evicted once the cache holds more
+# than max_bytes; that's only meant for assets that can be recreated (rotations, masks,
+# recoloured images, ...). Without one, the cache only does the accounting.
+class AssetCache(Generic[K, V]):
+    def __init__(self, name: str, size_of: Callable[[V], int], max_bytes: int|None=None):
+        self._name = name
+        self._size_of = size_of
+        self._max_bytes = max_bytes
+        self._num_bytes = 0
+
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._entry_bytes: dict[K, int] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def num_bytes(self) -> int:
+        return self._num_bytes
+
+    @property
+    def max_bytes(self) -> int|None:
+        return self._max_bytes
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # doesn't count as a lookup
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def values(self) -> list[V]:
+        return list(self._entries.values())
+
+    def get(self, key: K) -> V|None:
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        if key in self._entries:
+            self._num_bytes -= self._entry_bytes[key]
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        self._entry_bytes[key] = self._size_of(value)
+        self._num_bytes += self._entry_bytes[key]
+        self._evict()
+
+    # measure an entry again after it has grown, e.g. when something was added to it lazily
+    def update_size(self, key: K) -> None:
+        self._num_bytes -= self._entry_bytes[key]
+        self._entry_bytes[key] = self._size_of(self._entries[key])
+        self._num_bytes += self._entry_bytes[key]
+        self._evict()
+
+    def _evict(self) -> None:
+        if self._max_bytes is None:
+            return
+
+        # never evict the most recently used entry, even if it's bigger than the whole budget
+        while self._num_bytes > self._max_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            self._num_bytes -= self._entry_bytes.pop(key)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._entry_bytes.clear()
+        self._num_bytes = 0
+
+    def stats_string(self) -> str:
+        size = f'{self._num_bytes / 1024:.0f} KiB'
+        if self._max_bytes is not None:
+            size += f'/{self._max_bytes / 1024:.0f} KiB'
+
+        lookups = self._hits + self._misses
+        hit_rate = self._hits / lookups * 100 if lookups > 0 else 0.0
+        return f'{self._name}: {len(self._entries)} entries, {size}, {self._hits} hits, {self._misses} misses ({hit_rate:.0f}% hits), {self._evictions} evictions'
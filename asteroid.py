@@ -1,4 +1,3 @@
-from animation import Animation
 from enum import Enum, unique
 import pygame
 import random
@@ -18,7 +17,25 @@ class Asteroid(FlightCollisionSprite):
 
     MAX_SPEED = 120
 
-    def __init__(self, game: 'Game', size: 'Asteroid.Size', center: tuple[int, int]):
+    # asteroids are pooled, so this only allocates; spawn() sets one up for use
+    def __init__(self, game: 'Game'):
+        super().__init__(game.resource_loader.load_image('asteroid_small1.png'))
+        self._size = Asteroid.Size.Small
+
+    @staticmethod
+    def load_debris_images(game: 'Game') -> list[pygame.surface.Surface]:
+        return [
+            game.resource_loader.load_image(f'asteroid_debris{i+1}.png')
+            for i in range(5)
+        ]
+
+    @staticmethod
+    def spawn(game: 'Game', size: 'Asteroid.Size', center: tuple[int, int]) -> 'Asteroid':
+        asteroid = game.asteroid_pool.acquire()
+        asteroid.reset(game, size, center)
+        return asteroid
+
+    def reset(self, game: 'Game', size: 'Asteroid.Size', center: tuple[int, int]) -> None:
         small_images = [
             game.resource_loader.load_image(f'asteroid_small{i+1}.png')
             for i in range(1)
@@ -49,25 +66,19 @@ class Asteroid(FlightCollisionSprite):
             dx = float(random.randint(-Asteroid.MAX_SPEED, Asteroid.MAX_SPEED))
             dy = float(random.randint(-Asteroid.MAX_SPEED, Asteroid.MAX_SPEED))
 
-        super().__init__(random.choice(images), float(center[0]), float(center[1]), dx, dy)
+        self.image = random.choice(images)
+        self.x = float(center[0])
+        self.y = float(center[1])
+        self.dx = dx
+        self.dy = dy
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.rect.center = center
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = game.resource_loader.get_mask(self.image)
 
         game.flight_view_sprites.add(self)
         game.flight_collision_sprites.add(self)
-
-    @override
-    def update(self, game: 'Game') -> None:
-        self.x += self.dx * game.frame_time
-        self.y += self.dy * game.frame_time
-
-        self.rect.center = (int(self.x), int(self.y))
-
-        # wrap around if the asteroid goes past the bounds of the view
-        self.wrap(game.flight_view_size)
-
-        # we're not using this, but we should clear it each update so it won't keep filling up
-        self.collided_this_update.clear()
+        game.flight_bodies.add(self)
 
     @override
     def on_collide(self, game: 'Game', new_dx: float, new_dy: float, force: float) -> None:
@@ -84,13 +95,11 @@ class Asteroid(FlightCollisionSprite):
     def damage(self, game: 'Game', hit_points: int) -> None:
         game.flight_view_sprites.remove(self)
         game.flight_collision_sprites.remove(self)
+        game.flight_bodies.remove(self)
 
         if self._size == Asteroid.Size.Small:
-            animation_images = [
-                game.resource_loader.load_image(f'asteroid_debris{i+1}.png')
-                for i in range(5)
-            ]
-            animation = Animation(animation_images, 20)
+            animation = game.debris_pool.acquire()
+            animation.set_images(Asteroid.load_debris_images(game), 20)
             animation.rect.center = self.rect.center
             game.flight_view_sprites.add(animation)
 
@@ -101,7 +110,9 @@ class Asteroid(FlightCollisionSprite):
             else:
                 new_size = Asteroid.Size.Small
 
-            Asteroid(game, new_size, self.rect.center)
-            Asteroid(game, new_size, self.rect.center)
+            Asteroid.spawn(game, new_size, self.rect.center)
+            Asteroid.spawn(game, new_size, self.rect.center)
 
             game.update_asteroid_count(1)
+
+        game.asteroid_pool.release(self)
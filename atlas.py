@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import os
+import pygame
+
+# Packs the images of a directory into a few large pages, so they are decoded with one
+# image load per page instead of one per file and their pixels sit close together in
+# memory. Images are handed out as subsurfaces of the pages.
+#
+# The pages are built on the first run and stored in the cache directory together with
+# an index of the regions:
+#   key                             changes whenever an image is added, removed or modified
+#   number of pages
+#   name page x y width height      one line per image
+class TextureAtlas:
+    VERSION = 1
+    PAGE_SIZE = 1024
+    # bigger images are backgrounds that are drawn once, and would leave tall, mostly empty rows
+    MAX_IMAGE_SIZE = 128
+    INDEX_FILENAME = 'index.txt'
+
+    def __init__(self, pages: list[pygame.surface.Surface], regions: dict[str, tuple[int, pygame.rect.Rect]]):
+        self._pages = pages
+        self._regions = regions
+
+    @property
+    def pages(self) -> list[pygame.surface.Surface]:
+        return self._pages
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._regions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._regions
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def get(self, name: str) -> pygame.surface.Surface:
+        page, rect = self._regions[name]
+        return self._pages[page].subsurface(rect)
+
+    # Shelf packing: the images are sorted by height and placed left to right in rows, starting
+    # a new row when one is full and a new page when a page is full. Images bigger than
+    # MAX_IMAGE_SIZE are left out. Every page is cropped to the area actually used.
+    @staticmethod
+    def build(images: dict[str, pygame.surface.Surface], page_size: int=PAGE_SIZE) -> 'TextureAtlas':
+        max_image_size = min(TextureAtlas.MAX_IMAGE_SIZE, page_size)
+        names = sorted(
+            (name for name, image in images.items() if image.get_width() <= max_image_size and image.get_height() <= max_image_size),
+            key=lambda name: (-images[name].get_height(), -images[name].get_width(), name),
+        )
+
+        regions: dict[str, tuple[int, pygame.rect.Rect]] = {}
+        page_sizes: list[tuple[int, int]] = []
+        page = -1
+        x = y = shelf_height = page_size # forces a new page for the first image
+        for name in names:
+            width, height = images[name].get_size()
+            if x + width > page_size:
+                x = 0
+                y += shelf_height
+                shelf_height = 0
+            if y + height > page_size:
+                page += 1
+                page_sizes.append((0, 0))
+                x = y = shelf_height = 0
+
+            regions[name] = (page, pygame.rect.Rect(x, y, width, height))
+            page_sizes[page] = (max(page_sizes[page][0], x + width), max(page_sizes[page][1], y + height))
+            x += width
+            shelf_height = max(shelf_height, height)
+
+        pages = [pygame.surface.Surface(size, pygame.SRCALPHA) for size in page_sizes]
+        for name, (page, rect) in regions.items():
+            # the pages start out fully transparent, so taking the maximum copies the pixels exactly,
+            # where a normal blit would blend semi-transparent pixels with the black underneath
+            pages[page].blit(images[name], rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+        return TextureAtlas(pages, regions)
+
+    @staticmethod
+    def _source_key(image_dir: str, names: list[str], page_size: int) -> str:
+        key = hashlib.sha1(f'{TextureAtlas.VERSION} {page_size} {TextureAtlas.MAX_IMAGE_SIZE}'.encode('utf-8'))
+        for name in names:
+            stat = os.stat(os.path.join(image_dir, name))
+            key.update(f'\n{name} {stat.st_size} {stat.st_mtime_ns}'.encode('utf-8'))
+        return key.hexdigest()
+
+    @staticmethod
+    def _load_cached(cache_dir: str, key: str) -> 'TextureAtlas|None':
+        try:
+            with open(os.path.join(cache_dir, TextureAtlas.INDEX_FILENAME)) as f:
+                lines = f.read().splitlines()
+            if len(lines) < 2 or lines[0] != key:
+                return None
+
+            num_pages = int(lines[1])
+            regions: dict[str, tuple[int, pygame.rect.Rect]] = {}
+            for line in lines[2:]:
+                name, page, x, y, width, height = line.split()
+                regions[name] = (int(page), pygame.rect.Rect(int(x), int(y), int(width), int(height)))
+
+            pages = [
+                pygame.image.load(os.path.join(cache_dir, f'page{i}.png')).convert_alpha()
+                for i in range(num_pages)
+            ]
+        except (OSError, ValueError, pygame.error):
+            return None
+
+        return TextureAtlas(pages, regions)
+
+    def _save(self, cache_dir: str, key: str) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        for i, page in enumerate(self._pages):
+            pygame.image.save(page, os.path.join(cache_dir, f'page{i}.png'))
+
+        # the index is written last, so pages from an interrupted save are never used
+        with open(os.path.join(cache_dir, TextureAtlas.INDEX_FILENAME), 'w') as f:
+            f.write(f'{key}\n{len(self._pages)}\n')
+            for name, (page, rect) in self._regions.items():
+                f.write(f'{name} {page} {rect.x} {rect.y} {rect.width} {rect.height}\n')
+
+    # Loads the atlas of the PNG images in image_dir from cache_dir, building it first if the
+    # images have changed since it was cached. Needs the display to be set up.
+    @staticmethod
+    def load(image_dir: str, cache_dir: str, page_size: int=PAGE_SIZE) -> 'TextureAtlas':
+        logger = logging.getLogger('TextureAtlas')
+
+        names = sorted(name for name in os.listdir(image_dir) if name.endswith('.png'))
+        key = TextureAtlas._source_key(image_dir, names, page_size)
+
+        atlas = TextureAtlas._load_cached(cache_dir, key)
+        if atlas is not None:
+            return atlas
+
+        images = {name: pygame.image.load(os.path.join(image_dir, name)).convert_alpha() for name in names}
+        atlas = TextureAtlas.build(images, page_size)
+        atlas._pages = [page.convert_alpha() for page in atlas._pages]
+        logger.info(f'Packed {len(atlas)} of {len(images)} images into {len(atlas.pages)} pages')
+
+        try:
+            atlas._save(cache_dir, key)
+        except (OSError, pygame.error) as e:
+            # the atlas works without the cache, it just has to be built every time
+            logger.warning(f'Failed to cache texture atlas: {e}')
+
+        return atlas
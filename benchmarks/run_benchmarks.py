@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# assets are loaded relative to the working directory
+os.chdir(REPO_DIR)
+
+# keep stdout clean for the JSON output
+os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+from controller import Controller
+from game import Game
+from replay import RecordedJoystick
+from scenarios import Scenario, default_scenarios
+from stopwatch import NS_PER_MS
+
+SCRIPTED_GUID = '030056fb7e0500000920000000006803'
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='run scripted stress scenarios and report per-phase timings as JSON')
+    parser.add_argument('-s', '--scenario', action='append', help='only run scenarios with this name (may be given more than once)')
+    parser.add_argument('-t', '--ticks', type=int, default=600, help='number of ticks to simulate per scenario')
+    parser.add_argument('--seed', type=int, default=0, help='random seed used for every scenario')
+    parser.add_argument('--no-draw', action='store_true', help='only time the update phase')
+    parser.add_argument('-o', '--output', help='write the results to this file instead of stdout')
+
+    args = parser.parse_args()
+    return args
+
+def summarize(times: list[float]) -> dict[str, float]:
+    sorted_times = sorted(times)
+    num_times = len(sorted_times)
+    return {
+        'mean': sum(sorted_times) / num_times,
+        'median': sorted_times[num_times // 2],
+        'p95': sorted_times[min(num_times - 1, num_times * 95 // 100)],
+        'max': sorted_times[-1],
+    }
+
+def run_scenario(scenario: Scenario, num_ticks: int, seed: int, draw: bool) -> dict:
+    game = Game(headless=True, seed=seed)
+
+    joysticks: list[RecordedJoystick] = []
+    for _ in range(scenario.num_players):
+        joystick = RecordedJoystick(SCRIPTED_GUID)
+        game.controllers.append(Controller(joystick)) # type: ignore
+        joysticks.append(joystick)
+
+    game.start_mission(scenario.num_players, scenario.mode)
+    scenario.setup(game)
+
+    phase_names = ['total', 'update']
+    if draw:
+        phase_names += ['draw', 'blit', 'display']
+    phase_times: dict[str, list[float]] = {name: [] for name in phase_names}
+    update_rects: list[float] = []
+    merged_rects: list[float] = []
+    update_pixels: list[float] = []
+
+    stopwatches = game.stopwatches
+    for tick_num in range(num_ticks):
+        if scenario.tick is not None:
+            scenario.tick(game, tick_num, joysticks)
+
+        game.simulate_frame(draw)
+
+        for name in phase_names:
+            phase_times[name].append(stopwatches[name].last_ns / NS_PER_MS)
+
+        if draw:
+            update_rects.append(game.dirty_rects.last_num_rects)
+            merged_rects.append(game.dirty_rects.last_num_merged)
+            update_pixels.append(game.dirty_rects.last_num_pixels)
+
+    result = {
+        'mode': scenario.mode.name,
+        'players': scenario.num_players,
+        'flight_sprites': len(game.flight_view_sprites),
+        'collision_sprites': len(game.flight_collision_sprites),
+        'phases_ms': {name: summarize(times) for name, times in phase_times.items()},
+    }
+    if draw:
+        result['display_updates'] = {
+            'rects': summarize(update_rects),
+            'merged_rects': summarize(merged_rects),
+            'pixels': summarize(update_pixels),
+            'full_updates': game.dirty_rects.num_full_updates,
+        }
+    return result
+
+def main() -> None:
+    args = parse_args()
+
+    scenarios = default_scenarios()
+    if args.scenario is not None:
+        scenarios = [s for s in scenarios if s.name in args.scenario]
+
+    results = {
+        'ticks': args.ticks,
+        'seed': args.seed,
+        'draw': not args.no_draw,
+        'scenarios': {},
+    }
+    for scenario in scenarios:
+        print(f'Running {scenario.name}...', file=sys.stderr)
+        results['scenarios'][scenario.name] = run_scenario(scenario, args.ticks, args.seed, not args.no_draw)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(output)
+            f.write('\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+import math
+
+from game import Game, GameMode
+from replay import RecordedJoystick
+
+@dataclass
+class Scenario:
+    name: str
+    mode: GameMode
+    num_players: int
+    setup: Callable[[Game], None]
+    # called before every tick with the tick number and the scripted joysticks, one per player
+    tick: Callable[[Game, int, list[RecordedJoystick]], None]|None = None
+
+def asteroid_field(num_asteroids: int) -> Scenario:
+    def setup(game: Game) -> None:
+        # keep the ship alive so the mission doesn't end in the middle of a run
+        game.ship.set_invulnerable()
+        # a wave has wave * num_players big asteroids
+        game.spawn_asteroid_wave(num_asteroids)
+
+    return Scenario(f'asteroids_{num_asteroids}', GameMode.AsteroidField, 1, setup)
+
+def enemy_ships(num_enemies: int) -> Scenario:
+    def setup(game: Game) -> None:
+        game.ship.set_invulnerable()
+        # there is one more enemy every 5 waves
+        game.spawn_enemy_ship_wave((num_enemies - 1) * 5 + 1)
+
+    return Scenario(f'enemies_{num_enemies}', GameMode.Combat, 1, setup)
+
+def laser_spam(num_asteroids: int) -> Scenario:
+    def setup(game: Game) -> None:
+        game.ship.set_invulnerable()
+        game.spawn_asteroid_wave(num_asteroids)
+        for i in range(game.ship.num_weapons):
+            game.ship.enable_aiming(i)
+
+    def tick(game: Game, tick_num: int, joysticks: list[RecordedJoystick]) -> None:
+        ship = game.ship
+        ship.reset_weapon_cooldowns()
+        for i in range(ship.num_weapons):
+            # sweep the weapons in opposite directions and fire every tick
+            angle = (tick_num * 7.0 + i * 180.0) % 360.0
+            ship.set_aim_angle(i, angle)
+            ship.fire_laser(i)
+
+    return Scenario(f'laser_spam_{num_asteroids}', GameMode.AsteroidField, 1, setup, tick)
+
+def interior_walk(num_players: int) -> Scenario:
+    def setup(game: Game) -> None:
+        game.ship.set_invulnerable()
+
+    def tick(game: Game, tick_num: int, joysticks: list[RecordedJoystick]) -> None:
+        # walk everyone in circles at different rates so they keep bumping into walls and each other
+        for i, joystick in enumerate(joysticks):
+            angle = tick_num * 0.02 * (i + 1)
+            axes = (int(math.cos(angle) * 32767), int(math.sin(angle) * 32767))
+            joystick.set_state(axes, 0)
+
+    return Scenario(f'interior_walk_{num_players}', GameMode.AsteroidField, num_players, setup, tick)
+
+def default_scenarios() -> list[Scenario]:
+    return [
+        asteroid_field(10),
+        asteroid_field(50),
+        asteroid_field(200),
+        enemy_ships(5),
+        enemy_ships(20),
+        laser_spam(20),
+        interior_walk(5),
+    ]
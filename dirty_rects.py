@@ -0,0 +1,120 @@
+import pygame
+
+# Merges the rects drawn during a frame before they're passed to pygame.display.update.
+# Sprites that move a little every frame produce a rect for where they were and one for
+# where they are, and crowds of asteroids and lasers overlap each other, so many of the
+# rects cover the same pixels. Overlapping or touching rects are replaced by their union
+# as long as that doesn't add too many pixels that weren't drawn (max_waste, as a fraction
+# of the union). If the merged rects still cover more than full_update_coverage of the
+# screen, updating the whole screen at once is cheaper.
+class DirtyRectCoalescer:
+    DEFAULT_MAX_WASTE = 0.3
+    DEFAULT_FULL_UPDATE_COVERAGE = 0.5
+
+    def __init__(
+            self,
+            screen_rect: pygame.rect.Rect,
+            max_waste: float=DEFAULT_MAX_WASTE,
+            full_update_coverage: float=DEFAULT_FULL_UPDATE_COVERAGE,
+        ):
+        self._screen_rect = screen_rect.copy()
+        self._max_waste = max_waste
+        self._full_update_coverage = full_update_coverage
+
+        # the last frame
+        self._last_num_rects = 0
+        self._last_num_merged = 0
+        self._last_num_pixels = 0
+        self._last_full_update = False
+
+        self._num_frames = 0
+        self._num_full_updates = 0
+        self._total_rects = 0
+        self._total_merged = 0
+        self._total_pixels = 0
+
+    @property
+    def last_num_rects(self) -> int:
+        return self._last_num_rects
+
+    @property
+    def last_num_merged(self) -> int:
+        return self._last_num_merged
+
+    # pixels pushed to the display, including the ones merging added
+    @property
+    def last_num_pixels(self) -> int:
+        return self._last_num_pixels
+
+    @property
+    def last_full_update(self) -> bool:
+        return self._last_full_update
+
+    @property
+    def num_full_updates(self) -> int:
+        return self._num_full_updates
+
+    def _merge(self, rect: pygame.rect.Rect, other: pygame.rect.Rect) -> pygame.rect.Rect|None:
+        union = rect.union(other)
+        overlap = rect.clip(other)
+        covered = rect.width * rect.height + other.width * other.height - overlap.width * overlap.height
+        union_area = union.width * union.height
+        if union_area - covered > union_area * self._max_waste:
+            return None
+        return union
+
+    # Returns the rects to update, or None if the whole screen should be updated. The given
+    # rects aren't modified.
+    def coalesce(self, rects: list[pygame.rect.Rect]) -> list[pygame.rect.Rect]|None:
+        merged: list[pygame.rect.Rect] = []
+        for rect in rects:
+            rect = rect.clip(self._screen_rect)
+            if rect.width == 0 or rect.height == 0:
+                continue
+
+            # Every time the rect grows it may touch more of the merged ones. The search is
+            # done by collidelistall, so it stays cheap with a few hundred rects. Inflating
+            # the rect also finds the ones that only touch it.
+            while True:
+                absorbed: list[int] = []
+                for i in rect.inflate(2, 2).collidelistall(merged):
+                    union = self._merge(rect, merged[i])
+                    if union is not None:
+                        rect = union
+                        absorbed.append(i)
+                if len(absorbed) == 0:
+                    break
+
+                # the order doesn't matter, so absorbed rects are replaced by the last one
+                for i in reversed(absorbed):
+                    merged[i] = merged[-1]
+                    merged.pop()
+
+            merged.append(rect)
+
+        num_pixels = sum(rect.width * rect.height for rect in merged)
+        full_update = num_pixels > self._screen_rect.width * self._screen_rect.height * self._full_update_coverage
+        if full_update:
+            num_pixels = self._screen_rect.width * self._screen_rect.height
+
+        self._last_num_rects = len(rects)
+        self._last_num_merged = 1 if full_update else len(merged)
+        self._last_num_pixels = num_pixels
+        self._last_full_update = full_update
+
+        self._num_frames += 1
+        self._num_full_updates += int(full_update)
+        self._total_rects += self._last_num_rects
+        self._total_merged += self._last_num_merged
+        self._total_pixels += num_pixels
+
+        return None if full_update else merged
+
+    def stats_string(self) -> str:
+        num_frames = max(self._num_frames, 1)
+        return (
+            f'{self._last_num_rects} rects -> {self._last_num_merged} ({self._last_num_pixels / 1000:.0f}k pixels), '
+            f'average {self._total_rects / num_frames:.0f} -> {self._total_merged / num_frames:.0f} '
+            f'({self._total_pixels / num_frames / 1000:.0f}k pixels), '
+            f'{self._num_full_updates} full updates'
+        )
@@ -11,6 +11,7 @@ from aim_sprite import AimSprite
 from animation import ShipExplosionAnimation
 from laser import Laser
 from sprite import FlightCollisionSprite, Sprite
+from stopwatch import timed
 
 if TYPE_CHECKING:
     from game import Game
@@ -23,7 +24,8 @@ class MoveDetectionSprite(Sprite):
     MIN_HEIGHT2 = 75
     MAX_HEIGHT2 = 100
 
-    def __init__(self, origin: tuple[int, int]):
+    def __init__(self, game: 'Game', origin: tuple[int, int]):
+        self._resource_loader = game.resource_loader
         self._length = 0
         self._update_orig_image(
             MoveDetectionSprite.MIN_LENGTH,
@@ -54,12 +56,24 @@ class MoveDetectionSprite(Sprite):
         self._update_position()
 
     def _rotate(self) -> None:
-        self.image = pygame.transform.rotate(self._orig_image, self.angle)
+        self.image = self._resource_loader.rotate(self._orig_image, self.angle)
         self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = self._resource_loader.get_mask(self._orig_image, self.angle)
         self._update_position()
 
     def _update_orig_image(self, length: int, height1: int, height2: int) -> None:
+        # the detection shapes are shared by every enemy so their rotations and masks can be cached
+        key = ('move_detection', length, height1, height2)
+        image = self._resource_loader.derived_images.get(key)
+        if image is None:
+            image = MoveDetectionSprite._create_image(length, height1, height2)
+            self._resource_loader.derived_images.put(key, image)
+
+        self._orig_image = image
+        self._length = length
+
+    @staticmethod
+    def _create_image(length: int, height1: int, height2: int) -> pygame.surface.Surface:
         image = pygame.surface.Surface((length, height2))
         image.fill((0, 0, 0))
         image.set_colorkey((0, 0, 0))
@@ -73,8 +87,7 @@ class MoveDetectionSprite(Sprite):
         ]
         pygame.draw.polygon(image, (0, 50, 255), points)
 
-        self._orig_image = image
-        self._length = length
+        return image
 
     def _update_position(self) -> None:
         offset = self._length / 2
@@ -104,10 +117,12 @@ class EnemyShipConfig:
     max_aiming_iterations: int
 
 class EnemyShip(FlightCollisionSprite):
-    MAX_ACCELERATION = 5.0
+    MAX_ACCELERATION = 300.0 # pixels/second^2
     MAX_TARGET_VELOCITY = 300.0
     AIM_ANGLE_RATE = 120.0 # degrees
 
+    checks_collisions = True
+
     @unique
     class MoveState(Enum):
         MovingToTarget = 0
@@ -119,13 +134,14 @@ class EnemyShip(FlightCollisionSprite):
         image = game.resource_loader.load_image('enemy_ship1.png')
         super().__init__(image, x, y, 0.0, 0.0)
         self.rect.center = (int(x), int(y))
-        self.mask = pygame.mask.from_surface(self.image)
+        self.mask = game.resource_loader.get_mask(self.image)
 
         game.flight_view_sprites.add(self)
         game.flight_collision_sprites.add(self)
+        game.flight_bodies.add(self)
 
-        self._move_detection_sprite = MoveDetectionSprite(self.rect.center)
-        self._aim_sprite = AimSprite((240, 0, 0), self.rect.center)
+        self._move_detection_sprite = MoveDetectionSprite(game, self.rect.center)
+        self._aim_sprite = AimSprite(game, (240, 0, 0), self.rect.center)
         if game.debug:
             game.flight_view_sprites.add(self._move_detection_sprite)
             game.flight_view_sprites.add(self._aim_sprite)
@@ -149,6 +165,7 @@ class EnemyShip(FlightCollisionSprite):
         self._laser_delay = config.laser_delay
 
     @override
+    @timed('EnemyShip.update')
     def update(self, game: 'Game') -> None:
         self._hold_position_timer = max(0.0, self._hold_position_timer - game.frame_time)
         self._initial_fire_timer = max(0.0, self._initial_fire_timer - game.frame_time)
@@ -157,10 +174,6 @@ class EnemyShip(FlightCollisionSprite):
         if self._engine_enabled:
             self._update_engine(game)
 
-        self.x += self.dx * game.frame_time
-        self.y += self.dy * game.frame_time
-        self.rect.center = (int(self.x), int(self.y))
-        self.wrap(game.flight_view_size)
         self._aim_sprite.origin = self.rect.center
         self._move_detection_sprite.origin = self.rect.center
         self._move_detection_sprite.update_vel_proportion(Vector2(self.dx, self.dy).magnitude() / EnemyShip.MAX_TARGET_VELOCITY)
@@ -168,8 +181,6 @@ class EnemyShip(FlightCollisionSprite):
         if self._weapon_enabled:
             self._update_weapon(game)
 
-        self.check_collision(game)
-
     def _update_move_target(self, game: 'Game') -> None:
         view_width, view_height = game.flight_view_size
 
@@ -197,6 +208,7 @@ class EnemyShip(FlightCollisionSprite):
             self._move_target.x = x
             self._move_target.y = y
 
+    @timed('EnemyShip._update_engine')
     def _update_engine(self, game: 'Game') -> None:
         self_pos = Vector2(self.x, self.y)
         self_vel = Vector2(self.dx, self.dy)
@@ -208,7 +220,7 @@ class EnemyShip(FlightCollisionSprite):
             self._move_detection_sprite.angle = math.degrees(math.atan2(-self.dy, self.dx))
 
         move_collision = False
-        collide_sprites = pygame.sprite.spritecollide(self._move_detection_sprite, game.flight_collision_sprites, False, pygame.sprite.collide_mask)
+        collide_sprites = game.flight_collision_sprites.spritecollide(self._move_detection_sprite, pygame.sprite.collide_mask)
         for sprite in collide_sprites:
             if sprite is not self:
                 move_collision = True
@@ -252,12 +264,13 @@ class EnemyShip(FlightCollisionSprite):
             case _:
                 assert False, f'Unknown move state: {self._move_state}'
 
-        accel = self._target_vel - self_vel
-        if accel.magnitude() > EnemyShip.MAX_ACCELERATION:
-            accel = accel.normalize() * EnemyShip.MAX_ACCELERATION
+        max_vel_change = EnemyShip.MAX_ACCELERATION * game.frame_time
+        vel_change = self._target_vel - self_vel
+        if vel_change.magnitude() > max_vel_change:
+            vel_change = vel_change.normalize() * max_vel_change
 
-        self.dx += accel.x
-        self.dy += accel.y
+        self.dx += vel_change.x
+        self.dy += vel_change.y
 
     def _update_weapon(self, game: 'Game') -> None:
         if game.ship is None or self._initial_fire_timer > 0.0:
@@ -311,7 +324,7 @@ class EnemyShip(FlightCollisionSprite):
 
     def fire_laser(self, game: 'Game') -> None:
         if self._laser_fire_timer <= 0.0:
-            Laser(game, self.rect.center, self._aim_angle, self)
+            Laser.fire(game, self.rect.center, self._aim_angle, self)
             self._laser_fire_timer = self._laser_delay
 
     @override
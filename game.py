@@ -1,3 +1,6 @@
+from collections.abc import Callable
+from dataclasses import dataclass
+import datetime
 from enum import Enum, IntEnum, unique
 import logging
 import os
@@ -5,15 +8,29 @@ import pygame
 import pygame.locals
 import random
 import sys
+import time
 
+from animation import Animation
 from asteroid import Asteroid
 from controller import Controller
+from dirty_rects import DirtyRectCoalescer
 from enemy_ship import EnemyShip, EnemyShipConfig
+from laser import Laser
+from parallax_background import ParallaxBackground, create_space_layers
 from person import Person
+from physics import PhysicsGroup
+from pool import Pool
+from profiler import SamplingProfiler
+from render_group import AutoDirtyGroup
+from replay import InputRecorder, InputReplay
 from resource_loader import ResourceLoader
 from ship import Ship
-from sprite import FlightCollisionSprite, Sprite
-from stopwatch import Stopwatch
+from spatial_hash import SpatialHashGroup
+import star_background
+from sprite import MovingSprite, Sprite
+import stopwatch
+from stopwatch import NS_PER_MS, Stopwatch
+from tracer import Tracer
 
 DEBUG_TEXT_COLOR = (180, 0, 150)
 
@@ -43,10 +60,11 @@ class OptionsMenu:
         self._options_sprites: list[Sprite] = []
         self._axis_was_centered = False
         self._controller: Controller|None = None
+        self._resource_loader = game.resource_loader
         self._sound = game.resource_loader.load_sound('menu_select.wav')
 
         for text in self._options_text:
-            sprite = Sprite(self._font.render(text, True, self._color))
+            sprite = Sprite(game.resource_loader.render_text(self._font, text, True, self._color))
             sprite.rect.centerx = x
             sprite.rect.top = top
             self._options_sprites.append(sprite)
@@ -70,7 +88,7 @@ class OptionsMenu:
             text = self._options_text[i]
             if self._option_index == i:
                 text = f'< {text} >'
-            sprite.image = self._font.render(text, True, self._color)
+            sprite.image = self._resource_loader.render_text(self._font, text, True, self._color)
             sprite.rect.center = old_center
 
     def set_option_text(self, index: int, text: str) -> None:
@@ -320,12 +338,23 @@ class PauseMenu:
                     case 1:
                         game.end_mission(delay=False)
 
+@dataclass
+class GameTimer:
+    time_left: float # seconds
+    callback: Callable[[], None]
+
 class Game:
     MAX_FPS = 60.0
     MAX_FRAME_TIME_MS = 1000 / MAX_FPS
+    MAX_RENDER_FPS = 240.0
+
+    # the simulation always advances in fixed ticks, independent of the render rate
+    TICK_RATE = 60.0
+    TICK_TIME = 1 / TICK_RATE # seconds
+    MAX_CATCH_UP_TICKS = 5
 
-    RESET_GAME_EVENT = pygame.event.custom_type()
-    START_WAVE_EVENT = pygame.event.custom_type()
+    HEADLESS_DISPLAY_SIZE = (1920, 1080)
+    HEADLESS_REPORT_INTERVAL = 5.0 # seconds
 
     @unique
     class State(Enum):
@@ -333,10 +362,37 @@ class Game:
         Mission = 1
         PostMission = 2
 
-    def __init__(self, debug: bool=False):
+    def __init__(
+            self,
+            debug: bool=False,
+            headless: bool=False,
+            seed: int|None=None,
+            replay: InputReplay|None=None,
+            record_filename: str|None=None,
+            trace_filename: str|None=None,
+            profile: bool=False,
+            log_dir: str='logs',
+        ):
         self._debug = debug
+        self._headless = headless
+        self._replay = replay
         self._logger = logging.getLogger('Game')
 
+        # all randomness comes from the global generator so a session can be reproduced from its seed
+        if self._replay is not None:
+            if self._replay.tick_rate != Game.TICK_RATE:
+                raise ValueError(f'Replay tick rate ({self._replay.tick_rate}) does not match game tick rate ({Game.TICK_RATE})')
+            seed = self._replay.seed
+        elif seed is None:
+            seed = random.randrange(2**64)
+        self._seed = seed
+        random.seed(self._seed)
+
+        if self._headless:
+            # these must be set before pygame is initialized
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
         pygame.init()
         pygame.font.init()
         pygame.joystick.init()
@@ -345,24 +401,53 @@ class Game:
         # hide the cursor
         pygame.mouse.set_visible(False)
 
-        self._resource_loader = ResourceLoader()
+        self._resource_loader = ResourceLoader(strict=debug)
 
         self._fps_clock = pygame.time.Clock()
-        self._frame_time = 0.0
-
-        self._stopwatch_num_frames = int(Game.MAX_FPS)
-        self._work_stopwatch = Stopwatch(self._stopwatch_num_frames)
-        self._update_stopwatch = Stopwatch(self._stopwatch_num_frames)
-        self._draw_stopwatch = Stopwatch(self._stopwatch_num_frames)
-        self._blit_stopwatch = Stopwatch(self._stopwatch_num_frames)
-        self._display_update_stopwatch = Stopwatch(self._stopwatch_num_frames)
-
-        self._display_surf = pygame.display.set_mode(flags=pygame.FULLSCREEN)
+        self._frame_time = Game.TICK_TIME
+        self._tick_accumulator = 0.0
+        self._simulated_fps = 0.0
+        self._timers: list[GameTimer] = []
+        self._interpolated_sprites: list[tuple[MovingSprite, tuple[int, int]]] = []
+
+        self._work_stopwatch = stopwatch.get_stopwatch('Total')
+        self._update_stopwatch = stopwatch.get_stopwatch('Update')
+        self._draw_stopwatch = stopwatch.get_stopwatch('Draw')
+        self._blit_stopwatch = stopwatch.get_stopwatch('Blit')
+        self._display_update_stopwatch = stopwatch.get_stopwatch('Display')
+
+        if self._replay is not None:
+            # the view sizes affect the simulation, so the replay must use the recorded size
+            self._display_surf = pygame.display.set_mode(self._replay.display_size)
+        elif self._headless:
+            self._display_surf = pygame.display.set_mode(Game.HEADLESS_DISPLAY_SIZE)
+        else:
+            self._display_surf = pygame.display.set_mode(flags=pygame.FULLSCREEN)
         display_width, display_height = self._display_surf.get_size()
 
         self._logger.info(f'Python version: {sys.version}')
         self._logger.info(f'Pygame version: {pygame.version.ver}')
         self._logger.info(f'Display size: {display_width}, {display_height}')
+        self._logger.info(f'Random seed: {self._seed}')
+
+        # decode the mission assets while the setup menu is shown, apart from the images in the atlas
+        self._resource_loader.load_atlas()
+        self._resource_loader.start_preload()
+
+        # lasers are fired at any angle, so rotate their image up front rather than on the first shots
+        self._resource_loader.rotation_cache.prewarm(self._resource_loader.load_image(Laser.RED_IMAGE_NAME))
+
+        self._recorder: InputRecorder|None = None
+        if record_filename is not None:
+            self._recorder = InputRecorder(record_filename, self._seed, (display_width, display_height), Game.TICK_RATE)
+
+        self._tracer: Tracer|None = None
+        if trace_filename is not None:
+            self._tracer = Tracer(trace_filename)
+
+        self._log_dir = log_dir
+        self._profiler = SamplingProfiler()
+        self._profile_on_start = profile
 
         self._mode = GameMode.AsteroidField
 
@@ -374,14 +459,22 @@ class Game:
 
         self._setup_background = self._create_star_background((display_width, display_height))
 
-        space_background = self._create_star_background((display_width // 2, display_height))
+        # the interior view shows a plain star background and the flight view a parallax one, both
+        # from the same seed
+        space_seed = random.getrandbits(64)
+        view_size = (display_width // 2, display_height)
+        space_background = star_background.create_star_background(self._resource_loader, view_size, space_seed)
+        self._flight_background = ParallaxBackground(
+            create_space_layers(self._resource_loader, view_size, space_seed),
+            self._resource_loader.background_chunks,
+            view_size,
+        )
         self._mission_background = pygame.surface.Surface(pygame.display.get_window_size())
         self._mission_background.blit(space_background, (0, 0))
-        self._mission_background.blit(space_background, (display_width//2, 0))
+        self._flight_background.draw(self._mission_background.subsurface((display_width//2, 0), view_size))
 
         self._background = self._mission_background.copy()
         self._interior_view_background = self._background.subsurface((0, 0), (display_width//2, display_height))
-        self._flight_view_background = self._background.subsurface((display_width//2, 0), (display_width//2, display_height))
 
         self._display_surf.blit(self._background, (0, 0))
 
@@ -391,6 +484,7 @@ class Game:
         self._divider.rect.topleft = (display_width // 2 - 4, 0)
 
         self._update_rects: list[pygame.rect.Rect] = []
+        self._dirty_rects = DirtyRectCoalescer(self._display_surf.get_rect())
 
         # need to update the whole screen the first time
         self._update_rects.append(self._display_surf.get_rect())
@@ -400,17 +494,23 @@ class Game:
 
         self._timing_debug = False
         self._joystick_debug = False
+        self._cache_debug = False
         self._debug_font = pygame.font.SysFont('Courier', 20)
         self._debug_rect = pygame.rect.Rect(0, 0, 0, 0)
 
         self._menu_sprites = pygame.sprite.RenderUpdates()
-        self._interior_view_sprites = pygame.sprite.LayeredDirty()
-        self._flight_view_sprites = pygame.sprite.RenderUpdates()
-        self._interior_solid_sprites = pygame.sprite.Group()
-        self._flight_collision_sprites = pygame.sprite.Group()
-        self._info_overlay_sprites = pygame.sprite.LayeredDirty()
+        self._interior_view_sprites = AutoDirtyGroup()
+        self._flight_view_sprites = AutoDirtyGroup()
+        self._flight_collision_sprites = SpatialHashGroup()
+        self._flight_bodies = PhysicsGroup()
+        self._info_overlay_sprites = AutoDirtyGroup()
         self._people_sprites = pygame.sprite.Group()
 
+        # short lived flight sprites are reused rather than allocated for every shot and hit
+        self._laser_pool: Pool[Laser] = Pool('Laser', lambda: Laser(self))
+        self._asteroid_pool: Pool[Asteroid] = Pool('Asteroid', lambda: Asteroid(self))
+        self._debris_pool: Pool[Animation] = Pool('Debris', lambda: Animation(self, Asteroid.load_debris_images(self), 20, pool=self._debris_pool))
+
         self._joysticks: list[pygame.joystick.JoystickType] = []
         self._controllers: list[Controller] = []
 
@@ -425,6 +525,18 @@ class Game:
     def debug(self) -> bool:
         return self._debug
 
+    @property
+    def headless(self) -> bool:
+        return self._headless
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def simulated_fps(self) -> float:
+        return self._simulated_fps
+
     @property
     def mode(self) -> GameMode:
         return self._mode
@@ -442,23 +554,39 @@ class Game:
         return self._menu_sprites
 
     @property
-    def interior_view_sprites(self) -> 'pygame.sprite.LayeredDirty[Sprite]':
+    def interior_view_sprites(self) -> AutoDirtyGroup:
         return self._interior_view_sprites
 
     @property
-    def flight_view_sprites(self) -> 'pygame.sprite.RenderUpdates[Sprite]':
+    def flight_view_sprites(self) -> AutoDirtyGroup:
         return self._flight_view_sprites
 
     @property
-    def interior_solid_sprites(self) -> 'pygame.sprite.Group[Sprite]':
-        return self._interior_solid_sprites
+    def flight_collision_sprites(self) -> SpatialHashGroup:
+        return self._flight_collision_sprites
 
     @property
-    def flight_collision_sprites(self) -> 'pygame.sprite.Group[FlightCollisionSprite]':
-        return self._flight_collision_sprites
+    def flight_bodies(self) -> PhysicsGroup:
+        return self._flight_bodies
+
+    @property
+    def laser_pool(self) -> Pool[Laser]:
+        return self._laser_pool
 
     @property
-    def info_overlay_sprites(self) -> 'pygame.sprite.LayeredDirty[Sprite]':
+    def asteroid_pool(self) -> Pool[Asteroid]:
+        return self._asteroid_pool
+
+    @property
+    def debris_pool(self) -> Pool[Animation]:
+        return self._debris_pool
+
+    @property
+    def pools(self) -> list[Pool]:
+        return [self._laser_pool, self._asteroid_pool, self._debris_pool]
+
+    @property
+    def info_overlay_sprites(self) -> AutoDirtyGroup:
         return self._info_overlay_sprites
 
     @property
@@ -469,6 +597,20 @@ class Game:
     def controllers(self) -> list[Controller]:
         return self._controllers
 
+    @property
+    def dirty_rects(self) -> DirtyRectCoalescer:
+        return self._dirty_rects
+
+    @property
+    def stopwatches(self) -> dict[str, Stopwatch]:
+        return {
+            'total': self._work_stopwatch,
+            'update': self._update_stopwatch,
+            'draw': self._draw_stopwatch,
+            'blit': self._blit_stopwatch,
+            'display': self._display_update_stopwatch,
+        }
+
     @property
     def interior_view_size(self) -> tuple[int, int]:
         return self._interior_view_surface.get_size()
@@ -502,33 +644,50 @@ class Game:
         if self._enemy_count == 0:
             self._end_wave()
 
-    def _build_timing_string(self, title: str, indent: int, times: list[int]) -> str:
-        num_times = len(times)
-        times_avg = sum(times) / num_times
-        times_max = max(times)
-        times_min = min(times)
+    def _build_timing_string(self, sw: Stopwatch, indent: int, title_width: int) -> str:
+        times_avg = sw.mean_ns() / NS_PER_MS
+        times_p50, times_p95, times_p99 = (t / NS_PER_MS for t in sw.percentiles_ns([50, 95, 99]))
         times_avg_percentage = times_avg / Game.MAX_FRAME_TIME_MS * 100
-        title += ':'
-        padded_title = f'{title:<8}'
+        title = sw.name + ':'
         indent_str = ' ' * indent
-        s = f'{indent_str}{padded_title} avg: {times_avg:4.1f}/{Game.MAX_FRAME_TIME_MS:.1f} ms ({times_avg_percentage:2.0f}%), min: {times_min:2} ms, max: {times_max:2} ms'
+        padded_title = f'{indent_str}{title:<{title_width - indent}}'
+        s = f'{padded_title} avg: {times_avg:5.2f}/{Game.MAX_FRAME_TIME_MS:.1f} ms ({times_avg_percentage:2.0f}%), p50: {times_p50:5.2f}, p95: {times_p95:5.2f}, p99: {times_p99:5.2f} ms'
         return s
 
+    def dump_timings(self, filename: str) -> None:
+        stopwatch.registry().dump(filename)
+        self._logger.info(f'Wrote timings to {filename}')
+
     def _display_debug(self) -> None:
         text_strings: list[str] = []
 
         if self._timing_debug:
+            if self._resource_loader.preloading:
+                text_strings.append(f'Preloading assets: {self._resource_loader.preload_progress * 100:.0f}%')
+
             # FPS
             fps = self._fps_clock.get_fps()
             text_strings.append(f'FPS: {fps:.1f}')
 
-            # Frame times
-            text_strings.append(f'Frame times for past {self._stopwatch_num_frames} frames:')
-            text_strings.append(self._build_timing_string('Total', 1, self._work_stopwatch.times))
-            text_strings.append(self._build_timing_string('Update', 2, self._update_stopwatch.times))
-            text_strings.append(self._build_timing_string('Draw', 2, self._draw_stopwatch.times))
-            text_strings.append(self._build_timing_string('Blit', 3, self._blit_stopwatch.times))
-            text_strings.append(self._build_timing_string('Display', 3, self._display_update_stopwatch.times))
+            # Frame times (including any stopwatches registered by other modules)
+            timing_registry = stopwatch.registry()
+            text_strings.append(f'Frame times for past {timing_registry.num_samples} frames:')
+            stopwatches = list(timing_registry.walk())
+            title_width = max(depth + 1 + len(sw.name) + 1 for sw, depth in stopwatches)
+            for sw, depth in stopwatches:
+                text_strings.append(self._build_timing_string(sw, depth + 1, title_width))
+
+            text_strings.append(f'Display updates: {self._dirty_rects.stats_string()}')
+
+            text_strings.append('Object pools:')
+            for pool in self.pools:
+                text_strings.append(f' {pool.stats_string()}')
+
+        if self._cache_debug:
+            # Asset memory
+            text_strings.append(f'Asset caches ({self._resource_loader.num_bytes / (1024 * 1024):.1f} MiB):')
+            for cache in self._resource_loader.caches:
+                text_strings.append(f' {cache.stats_string()}')
 
         if self._joystick_debug:
             # Joystick info
@@ -552,98 +711,65 @@ class Game:
 
         y = 0
         for s in text_strings:
-            text_surface = self._debug_font.render(s, False, DEBUG_TEXT_COLOR)
+            # only lines that changed since they were last shown are rendered again
+            text_surface = self._resource_loader.render_text(self._debug_font, s, False, DEBUG_TEXT_COLOR)
             self._display_surf.blit(text_surface, (0, y))
             rect = text_surface.get_rect()
             y += rect.bottom
             self._debug_rect.width = max(self._debug_rect.width, rect.width)
             self._debug_rect.height = y
 
-        # if the debug text overlaps any sprites, they will need to be redrawn
-        for sprite in self._interior_view_sprites:
-            if self._debug_rect.colliderect(sprite.rect):
-                sprite.dirty = 1
-
+    # the background has its own random generator, seeded from the game's so it's the same in replays
     def _create_star_background(self, size: tuple[int, int]) -> pygame.surface.Surface:
-        surface = pygame.surface.Surface(size)
-        surface.fill((0, 0, 0))
-        width = surface.get_width()
-        height = surface.get_height()
-        num_stars = width * height // 5000
-        num_white_stars = random.randint(num_stars * 3 // 8, num_stars * 5 // 8)
-        num_remaining = num_stars - num_white_stars
-        num_yellow_stars = random.randint(num_remaining * 1 // 2, num_remaining * 5 // 8)
-        num_red_stars = max(0, num_stars - num_white_stars - num_yellow_stars)
-
-        star_info = [
-            # white
-            (num_white_stars, (250, 250, 250)),
-            # yellow
-            (num_yellow_stars, (255, 255, 180)),
-            # red
-            (num_red_stars, (255, 160, 180)),
-        ]
+        seed = random.getrandbits(64)
+        return star_background.create_star_background(self._resource_loader, size, seed)
 
-        star_surface = pygame.surface.Surface((1, 1))
-        for num, color in star_info:
-            for _ in range(num):
-                x = random.randint(0, width - 1)
-                y = random.randint(0, height - 1)
-                star_surface.set_at((0, 0), color)
-                star_surface.set_alpha(random.randint(60, 255))
-                surface.blit(star_surface, (x, y))
-
-        galaxy_images = [
-            self.resource_loader.load_image(f'galaxy{i+1}.png')
-            for i in range(2)
-        ]
-        num_galaxies = random.choice([2, 3])
-        for i in range(num_galaxies):
-            galaxy_surface = galaxy_images[i % len(galaxy_images)]
-            x = (width // num_galaxies * i) + random.randint(0, width // num_galaxies)
-            y = random.randint(50, height - 50)
-            galaxy_surface.set_alpha(random.randint(100, 200))
-            angle = random.random() * 40.0 - 20.0
-            galaxy_surface_rotated = pygame.transform.rotate(galaxy_surface, angle)
-            surface.blit(galaxy_surface_rotated, (x, y))
-
-        nebula_part_images = [
-            self.resource_loader.load_image(f'nebula_part{i+1}.png')
-            for i in range(5)
-        ]
-        num_nebulas = 2
-        for i in range(num_nebulas):
-            nebula_width = 100 + random.randint(-20, 20)
-            nebula_heigh = 140 + random.randint(-25, 25)
-            nebula_surface = pygame.surface.Surface((nebula_width, nebula_heigh))
-            num_parts = (nebula_width * nebula_heigh) // 50 + random.randint(0, 50)
-            for _ in range(num_parts):
-                part = random.choice(nebula_part_images)
-                part.set_alpha(random.randint(10, 30))
-                part_width = part.get_rect().width
-                part_height = part.get_rect().height
-                x = int(random.normalvariate(nebula_width / 2, nebula_width / 6) - part_width / 2)
-                y = int(random.normalvariate(nebula_heigh / 2, nebula_heigh / 6) - part_height / 2)
-                nebula_surface.blit(part, (x, y))
-            x = random.randint(100, width - 100)
-            y = (height // num_nebulas * i) + random.randint(100, height // num_nebulas - 100)
-            nebula_surface.set_alpha(130)
-            surface.blit(nebula_surface, (x, y))
-
-        return surface
+    def _set_timer(self, delay: float, callback: Callable[[], None]) -> None:
+        self._timers.append(GameTimer(delay, callback))
 
-    def _reset_game(self) -> None:
-        self._menu_sprites.empty()
-        self._interior_view_sprites.empty()
-        self._flight_view_sprites.empty()
-        self._interior_solid_sprites.empty()
-        self._flight_collision_sprites.empty()
-        self._info_overlay_sprites.empty()
+    def _update_timers(self) -> None:
+        for timer in self._timers:
+            timer.time_left -= self._frame_time
 
-        self._paused = False
-        self._ship = None
+        # remove expired timers before running any callbacks since they may set or clear timers
+        expired_timers = [timer for timer in self._timers if timer.time_left <= 0.0]
+        self._timers = [timer for timer in self._timers if timer.time_left > 0.0]
 
-        self.start_setup()
+        for timer in expired_timers:
+            timer.callback()
+
+    def _reset_game(self) -> None:
+        # this is called from a timer in the middle of an update, but it's a loading point like starting a mission
+        with self._resource_loader.loading():
+            self._timers.clear()
+            self._menu_sprites.empty()
+            self._interior_view_sprites.empty()
+            self._people_sprites.empty()
+            self._flight_view_sprites.empty()
+            self._flight_collision_sprites.empty()
+            self._flight_bodies.empty()
+            self._info_overlay_sprites.empty()
+
+            for pool in self.pools:
+                self._logger.info(pool.stats_string())
+                pool.release_all()
+
+            for cache in self._resource_loader.caches:
+                self._logger.info(cache.stats_string())
+
+            self._paused = False
+            self._ship = None
+
+            self.start_setup()
+
+    # start the given wave right away, for scripted runs like the benchmarks
+    def spawn_asteroid_wave(self, wave: int) -> None:
+        self._wave = wave
+        self._new_asteroid_wave()
+
+    def spawn_enemy_ship_wave(self, wave: int) -> None:
+        self._wave = wave
+        self._new_enemy_ship_wave()
 
     def _new_asteroid_wave(self) -> None:
         flight_view_size = self._flight_view_surface.get_size()
@@ -653,7 +779,7 @@ class Game:
         for _ in range(self._asteroid_count):
             x = random.randint(0, flight_view_width - 1)
             y = random.randint(0, flight_view_height // 10)
-            Asteroid(self, Asteroid.Size.Big, (x, y))
+            Asteroid.spawn(self, Asteroid.Size.Big, (x, y))
 
     def _new_enemy_ship_wave(self) -> None:
         flight_view_size = self._flight_view_surface.get_size()
@@ -708,6 +834,14 @@ class Game:
         self._update_rects.append(self._display_surf.get_rect())
 
     def start_mission(self, num_players: int, game_mode: GameMode) -> None:
+        # whatever hasn't been preloaded yet is loaded now rather than in the middle of the mission
+        self._resource_loader.finish_preload()
+
+        # this is usually called by the setup menu in the middle of an update, but it's a loading point
+        with self._resource_loader.loading():
+            self._start_mission(num_players, game_mode)
+
+    def _start_mission(self, num_players: int, game_mode: GameMode) -> None:
         pygame.mixer_music.stop()
         pygame.mixer_music.unload()
 
@@ -749,7 +883,7 @@ class Game:
     def end_mission(self, delay: bool) -> None:
         self._state = Game.State.PostMission
         if delay:
-            pygame.time.set_timer(Game.RESET_GAME_EVENT, 5_000, 1)
+            self._set_timer(5.0, self._reset_game)
         else:
             self._reset_game()
 
@@ -765,9 +899,15 @@ class Game:
     def _end_wave(self) -> None:
         self._wave += 1
 
-        pygame.time.set_timer(Game.START_WAVE_EVENT, 3_000, 1)
+        self._set_timer(3.0, self._on_start_wave_timer)
+
+    def _on_start_wave_timer(self) -> None:
+        if self._state == Game.State.Mission:
+            self._start_wave()
 
     def _process_events(self) -> bool:
+        self._begin_phase('_process_events')
+
         quit_game = False
         for event in pygame.event.get():
             match event.type:
@@ -779,12 +919,16 @@ class Game:
                         self._timing_debug = not self._timing_debug
                     elif event.key == pygame.K_F2 and pygame.K_F2 not in self._pressed_keys:
                         self._joystick_debug = not self._joystick_debug
+                    elif event.key == pygame.K_F3 and pygame.K_F3 not in self._pressed_keys:
+                        self._toggle_profiler()
+                    elif event.key == pygame.K_F4 and pygame.K_F4 not in self._pressed_keys:
+                        self._cache_debug = not self._cache_debug
                     self._pressed_keys.add(event.key)
 
                 case pygame.locals.KEYUP:
                     self._pressed_keys.remove(event.key)
 
-                case pygame.locals.JOYDEVICEADDED:
+                case pygame.locals.JOYDEVICEADDED if self._replay is None:
                     joystick = pygame.joystick.Joystick(event.device_index)
                     self._joysticks.append(joystick)
                     self._controllers.append(Controller(joystick))
@@ -793,7 +937,7 @@ class Game:
                     name = joystick.get_name()
                     self._logger.info(f'Joystick added: {joystick_id}, {guid}, {name}')
 
-                case pygame.locals.JOYDEVICEREMOVED:
+                case pygame.locals.JOYDEVICEREMOVED if self._replay is None:
                     idx = event.instance_id
                     for joystick in self._joysticks:
                         if joystick.get_id() == idx:
@@ -805,17 +949,27 @@ class Game:
                             self._logger.info(f'Joystick removed: {joystick_id}, {guid}, {name}')
                             break
 
-                case Game.RESET_GAME_EVENT:
-                    self._reset_game()
-
-                case Game.START_WAVE_EVENT:
-                    if self._state == Game.State.Mission:
-                        self._start_wave()
+        self._end_phase('_process_events')
 
         return quit_game
 
     def _update_sprites(self) -> None:
         self._update_stopwatch.start()
+        self._begin_phase('_update_sprites')
+
+        # nothing may be loaded from disk during an update, except at explicit loading points
+        self._resource_loader.update_preload()
+        self._resource_loader.io_allowed = False
+
+        # controller state is captured once per tick so replays see exactly the same inputs
+        if self._replay is not None:
+            if not self._replay.finished:
+                self._replay.play_tick(self._controllers)
+        elif self._recorder is not None:
+            self._recorder.record_tick(self._joysticks)
+
+        if not self._paused:
+            self._update_timers()
 
         match self._state:
             case Game.State.Setup:
@@ -824,43 +978,143 @@ class Game:
                 if self._paused:
                     self._pause_menu.update(self)
                 else:
-                    for sprite in self.interior_view_sprites:
-                        sprite.update(self)
-                    for sprite in self.flight_view_sprites:
-                        sprite.update(self)
+                    self._update_sprite_group(self.interior_view_sprites)
+                    self._update_flight()
 
                     for controller in self.controllers:
                         if controller.get_pause_button():
                             self.pause(controller)
                             break
             case Game.State.PostMission:
-                for sprite in self.flight_view_sprites:
-                    sprite.update(self)
+                self._update_flight()
 
+        for pool in self.pools:
+            pool.recycle()
+
+        self._trace_counters()
+        self._resource_loader.io_allowed = True
+        self._end_phase('_update_sprites')
         self._update_stopwatch.stop()
 
-    def _draw_sprites(self) -> None:
+    def _update_flight(self) -> None:
+        # move every flight body at once, then let the sprites react to where they ended up
+        self._begin_phase('PhysicsGroup.step')
+        self._flight_bodies.step(self.frame_time, self.flight_view_size, self._flight_collision_sprites)
+        self._end_phase('PhysicsGroup.step')
+
+        self._begin_phase('PhysicsGroup.solve_collisions')
+        self._flight_bodies.solve_collisions(self, self._flight_collision_sprites)
+        self._end_phase('PhysicsGroup.solve_collisions')
+
+        self._update_sprite_group(self.flight_view_sprites)
+
+    def _update_sprite_group(self, group: 'pygame.sprite.AbstractGroup[Sprite]') -> None:
+        if self._tracer is None:
+            for sprite in group:
+                sprite.update(self)
+            return
+
+        # trace consecutive updates of the same class as a single event to keep the trace small
+        run_class: type|None = None
+        run_start = 0
+        for sprite in group:
+            sprite_class = type(sprite)
+            if sprite_class is not run_class:
+                now = Tracer.now()
+                if run_class is not None:
+                    self._tracer.complete(f'{run_class.__name__}.update', run_start, now)
+                run_class = sprite_class
+                run_start = now
+            sprite.update(self)
+
+        if run_class is not None:
+            self._tracer.complete(f'{run_class.__name__}.update', run_start, Tracer.now())
+
+    def _begin_phase(self, name: str) -> None:
+        if self._tracer is not None:
+            self._tracer.begin(name)
+        self._profiler.push_phase(name)
+
+    def _end_phase(self, name: str) -> None:
+        if self._tracer is not None:
+            self._tracer.end(name)
+        self._profiler.pop_phase()
+
+    def _trace_counters(self) -> None:
+        if self._tracer is None:
+            return
+
+        self._tracer.counter('Sprites', {
+            'menu': len(self._menu_sprites),
+            'interior view': len(self._interior_view_sprites),
+            'flight view': len(self._flight_view_sprites),
+            'flight collision': len(self._flight_collision_sprites),
+            'flight bodies': self._flight_bodies.num_bodies,
+            'people': len(self._people_sprites),
+        })
+
+    def _interpolate_flight_sprites(self, alpha: float) -> None:
+        for sprite, center in self._flight_bodies.interpolated_centers(alpha, self.flight_view_size):
+            if center != sprite.rect.center:
+                self._interpolated_sprites.append((sprite, sprite.rect.center))
+                sprite.rect.center = center
+
+    def _restore_flight_sprites(self) -> None:
+        for sprite, center in self._interpolated_sprites:
+            sprite.rect.center = center
+        self._interpolated_sprites.clear()
+
+    # The views only redraw what has changed, so anything drawn over them has to repaint them
+    # when it's cleared. rect is in display coordinates.
+    def _repaint_views(self, rect: pygame.rect.Rect) -> None:
+        for surface, sprites in ((self._interior_view_surface, self._interior_view_sprites), (self._flight_view_surface, self._flight_view_sprites)):
+            view_rect = surface.get_rect(topleft=surface.get_offset())
+            area = rect.clip(view_rect)
+            if area.width > 0 and area.height > 0:
+                sprites.repaint_rect(area.move(-view_rect.x, -view_rect.y))
+
+    # alpha is how far between the last two ticks the sprites should be drawn
+    def _draw_sprites(self, alpha: float=1.0) -> None:
+        self._begin_phase('_draw_sprites')
         self._draw_stopwatch.start()
         self._blit_stopwatch.start()
 
         if self._debug_rect.width > 0 and self._debug_rect.height > 0:
             rect = self._display_surf.blit(self._background, (0, 0), self._debug_rect)
             self._update_rects.append(rect)
+            self._repaint_views(rect)
+
+        # the overlays restore the background under them before they're drawn over the views again
+        for rect in self._menu_sprites.lostsprites + list(self._menu_sprites.spritedict.values()):
+            # sprites that haven't been drawn yet have no rect
+            if rect:
+                self._repaint_views(rect)
+        for rect in self._info_overlay_sprites.changed_rects(self._display_surf):
+            self._repaint_views(rect)
 
         self._interior_view_sprites.clear(self._interior_view_surface, self._interior_view_background)
-        self._flight_view_sprites.clear(self._flight_view_surface, self._flight_view_background)
-        self._info_overlay_sprites.clear(self._display_surf, self._background)
+        # only the background chunks under the sprites are blitted
+        self._flight_view_sprites.clear(self._flight_view_surface, self._flight_background.restore)
+        # the info overlay has no background of its own: the views are repainted under it instead
         self._menu_sprites.clear(self._display_surf, self._background)
 
-        rects = self._interior_view_sprites.draw(self._interior_view_surface)
-        self._update_rects += rects
+        view_rects = self._interior_view_sprites.draw(self._interior_view_surface)
 
+        if not self._paused:
+            self._interpolate_flight_sprites(alpha)
         rects = self._flight_view_sprites.draw(self._flight_view_surface)
+        self._restore_flight_sprites()
         offset = self._display_surf.get_rect().width // 2
         for rect in rects:
             adjusted_rect = rect.copy()
             adjusted_rect.x += offset
-            self._update_rects.append(adjusted_rect)
+            view_rects.append(adjusted_rect)
+        self._update_rects += view_rects
+
+        # overlays that the views have drawn over need to be drawn again
+        for sprite in self._info_overlay_sprites:
+            if sprite.dirty == 0 and sprite.rect.collidelist(view_rects) != -1:
+                sprite.dirty = 1
 
         if self._state != Game.State.Setup:
             self._display_surf.blit(self._divider.image, self._divider.rect)
@@ -872,7 +1126,7 @@ class Game:
         rects = self._menu_sprites.draw(self._display_surf)
         self._update_rects += rects
 
-        if self._timing_debug or self._joystick_debug:
+        if self._timing_debug or self._joystick_debug or self._cache_debug:
             self._display_debug()
         else:
             self._debug_rect.size = (0, 0)
@@ -884,31 +1138,144 @@ class Game:
 
         self._display_update_stopwatch.start()
 
-        pygame.display.update(self._update_rects)
+        self._begin_phase('pygame.display.update')
+        update_rects = self._dirty_rects.coalesce(self._update_rects)
+        if update_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(update_rects)
         self._update_rects.clear()
+        self._end_phase('pygame.display.update')
+
+        if self._tracer is not None:
+            self._tracer.counter('Update rects', {
+                'count': self._dirty_rects.last_num_rects,
+                'merged': self._dirty_rects.last_num_merged,
+            })
+            self._tracer.counter('Update pixels', {'pixels': self._dirty_rects.last_num_pixels})
 
         self._display_update_stopwatch.stop()
         self._draw_stopwatch.stop()
+        self._end_phase('_draw_sprites')
+
+    # process events and advance the simulation by exactly one tick, for driving the game from scripts
+    def simulate_frame(self, draw: bool=True) -> bool:
+        self._work_stopwatch.start()
+        self._begin_phase('Frame')
+
+        quit_game = self._process_events()
+
+        self._update_sprites()
 
-    def mainloop(self) -> None:
+        if draw:
+            self._draw_sprites()
+
+        self._end_phase('Frame')
+        self._work_stopwatch.stop()
+        stopwatch.registry().end_frame()
+
+        return quit_game
+
+    def mainloop(self, max_frames: int|None=None) -> None:
         self.start_setup()
 
-        self._work_stopwatch.start()
-        while True:
+        num_frames = 0
+        start_time = time.perf_counter()
+        report_time = start_time
+        report_frames = 0
+
+        if self._profile_on_start:
+            self._profiler.start()
+
+        # don't count setup time as time that needs to be simulated
+        self._fps_clock.tick()
+        self._tick_accumulator = 0.0
+
+        while max_frames is None or num_frames < max_frames:
             self._logger.debug(f'Ticks: {pygame.time.get_ticks()}')
+            self._work_stopwatch.start()
+            self._begin_phase('Frame')
 
             quit_game = self._process_events()
+            if not quit_game and self._replay is not None and self._replay.finished:
+                self._logger.info(f'Replay finished after {self._replay.num_ticks_played} ticks')
+                quit_game = True
+
+            # close the frame's trace event and profiler phase even though it isn't finished
             if quit_game:
+                self._end_phase('Frame')
+                self._work_stopwatch.stop()
                 break
 
-            self._update_sprites()
-            self._draw_sprites()
+            if self._headless:
+                # run as fast as possible, one tick per frame
+                self._update_sprites()
+            else:
+                num_ticks = 0
+                while self._tick_accumulator >= Game.TICK_TIME and num_ticks < Game.MAX_CATCH_UP_TICKS:
+                    self._update_sprites()
+                    self._tick_accumulator -= Game.TICK_TIME
+                    num_ticks += 1
+
+                # if we have fallen too far behind, drop the time instead of trying to catch up
+                if self._tick_accumulator >= Game.TICK_TIME:
+                    self._logger.debug(f'Dropping {self._tick_accumulator:.3f} s of simulation time')
+                    self._tick_accumulator %= Game.TICK_TIME
 
+            if not self._headless:
+                self._draw_sprites(self._tick_accumulator / Game.TICK_TIME)
+
+            self._end_phase('Frame')
             self._work_stopwatch.stop()
+            stopwatch.registry().end_frame()
 
-            frame_time_ms = self._fps_clock.tick(Game.MAX_FPS)
-            self._frame_time = frame_time_ms / 1000
+            num_frames += 1
 
-            self._work_stopwatch.start()
+            if self._headless:
+                current_time = time.perf_counter()
+                if current_time - report_time >= Game.HEADLESS_REPORT_INTERVAL:
+                    self._simulated_fps = (num_frames - report_frames) / (current_time - report_time)
+                    self._logger.info(f'Simulated FPS: {self._simulated_fps:.1f}')
+                    report_time = current_time
+                    report_frames = num_frames
+            else:
+                frame_time_ms = self._fps_clock.tick(Game.MAX_RENDER_FPS)
+                self._tick_accumulator += frame_time_ms / 1000
+
+        if self._headless:
+            elapsed_time = time.perf_counter() - start_time
+            if elapsed_time > 0.0:
+                self._simulated_fps = num_frames / elapsed_time
+            self._logger.info(f'Simulated {num_frames} frames in {elapsed_time:.2f} s ({self._simulated_fps:.1f} FPS)')
+
+        self.save_recording()
+        self.save_trace()
+        self.stop_profiler()
 
         pygame.quit()
+
+    def save_recording(self) -> None:
+        if self._recorder is not None:
+            self._recorder.save()
+            self._logger.info(f'Saved {self._recorder.num_ticks} recorded ticks to {self._recorder.filename}')
+
+    def _toggle_profiler(self) -> None:
+        if self._profiler.running:
+            self.stop_profiler()
+        else:
+            self._profiler.start()
+            self._logger.info('Started sampling profiler')
+
+    def stop_profiler(self) -> None:
+        if not self._profiler.running:
+            return
+
+        self._profiler.stop()
+        filename = os.path.join(self._log_dir, datetime.datetime.now().strftime('profile_%Y-%m-%d_%H-%M-%S.folded'))
+        self._profiler.save(filename)
+        self._logger.info(f'Saved {self._profiler.num_samples} profiler samples to {filename}')
+
+    def save_trace(self) -> None:
+        if self._tracer is not None:
+            self._tracer.save()
+            self._logger.info(f'Saved {self._tracer.num_events} trace events to {self._tracer.filename}')
@@ -1,49 +1,131 @@
 import math
-import pygame
 from typing import TYPE_CHECKING, override
 
-from sprite import Sprite
+from sprite import FlightCollisionSprite, MovingSprite, Sprite
+from stopwatch import timed
 
 if TYPE_CHECKING:
     from game import Game
 
-class Laser(Sprite):
+class Laser(MovingSprite):
     RED_IMAGE_NAME = 'laser_red.png'
 
     SPEED = 1000
 
-    def __init__(self, game: 'Game', center: tuple[int, int], angle: float, parent: Sprite):
-        super().__init__(pygame.transform.rotate(game.resource_loader.load_image(Laser.RED_IMAGE_NAME), angle))
-        self.rect.center = center
-        self.mask = pygame.mask.from_surface(self.image)
-        self._parent = parent
+    # lasers are pooled, so this only allocates; fire() sets one up for use
+    def __init__(self, game: 'Game'):
+        super().__init__(game.resource_loader.load_image(Laser.RED_IMAGE_NAME))
+        # the image points along the direction the laser flies
+        self._length = self.image.get_width()
+        self._parent: Sprite|None = None
+        self._sound = game.resource_loader.load_sound('laser.wav')
 
-        game.flight_view_sprites.add(self)
+    @staticmethod
+    def fire(game: 'Game', center: tuple[int, int], angle: float, parent: Sprite) -> 'Laser':
+        laser = game.laser_pool.acquire()
+        laser.reset(game, center, angle, parent)
+        return laser
 
+    def reset(self, game: 'Game', center: tuple[int, int], angle: float, parent: Sprite) -> None:
+        image = game.resource_loader.load_image(Laser.RED_IMAGE_NAME)
+        self.image = game.resource_loader.rotate(image, angle)
         self.x = float(center[0])
         self.y = float(center[1])
-
         self.dx = Laser.SPEED * math.cos(math.radians(angle))
         self.dy = Laser.SPEED * math.sin(math.radians(-angle))
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.rect.center = center
+        self.mask = game.resource_loader.get_mask(image, angle)
+        self._parent = parent
+
+        game.flight_view_sprites.add(self)
+        game.flight_bodies.add(self)
+
+        self._sound.play()
 
-        sound = game.resource_loader.load_sound('laser.wav')
-        sound.play()
+    def _remove(self, game: 'Game') -> None:
+        self.kill()
+        self._parent = None
+        game.laser_pool.release(self)
 
     @override
+    @timed('Laser.update')
     def update(self, game: 'Game') -> None:
-        self.x += self.dx * game.frame_time
-        self.y += self.dy * game.frame_time
-
-        self.rect.center = (int(self.x), int(self.y))
+        sprite = self._find_hit(game)
+        if sprite is not None:
+            sprite.damage(game, 1)
+            self._remove(game)
+            return
 
         # remove laser when it goes beyond the bounds of the view
         view_width, view_height = game.flight_view_size
         if self.x < 0.0 or self.x >= view_width or self.y < 0.0 or self.y >= view_height:
-            game.flight_view_sprites.remove(self)
+            self._remove(game)
+
+    # Find the first sprite the laser hit along the whole path it moved this tick, so fast lasers
+    # can't skip over small sprites on long ticks. Candidates come from the spatial hash and get a
+    # cheap segment versus circle test, which gives the part of the path where the laser can touch
+    # them. Their masks are then checked along that part. The laser flies along its own length,
+    # so stepping by a pixel less than that covers the path without gaps.
+    def _find_hit(self, game: 'Game') -> FlightCollisionSprite|None:
+        start_x = self.prev_x
+        start_y = self.prev_y
+        path_x = self.x - start_x
+        path_y = self.y - start_y
+        path_length_sq = path_x * path_x + path_y * path_y
+
+        start_rect = self.rect.move(int(start_x) - self.rect.centerx, int(start_y) - self.rect.centery)
+        swept_rect = self.rect.union(start_rect)
+        laser_radius = max(self.rect.width, self.rect.height) / 2
+
+        candidates: list[tuple[float, float, FlightCollisionSprite]] = []
+        for sprite in game.flight_collision_sprites.query(swept_rect):
+            if sprite is self._parent:
+                continue
+
+            # where along the path the laser is within reach of the sprite's center
+            center_x, center_y = sprite.rect.center
+            offset_x = start_x - center_x
+            offset_y = start_y - center_y
+            radius = laser_radius + math.hypot(sprite.rect.width, sprite.rect.height) / 2
+            c = offset_x * offset_x + offset_y * offset_y - radius * radius
+            if path_length_sq == 0.0:
+                if c <= 0.0:
+                    candidates.append((0.0, 0.0, sprite)) # type: ignore
+                continue
 
-        collide_sprites = pygame.sprite.spritecollide(self, game.flight_collision_sprites, False, pygame.sprite.collide_mask)
-        for sprite in collide_sprites:
-            if sprite is not self._parent:
-                sprite.damage(game, 1)
-                self.kill()
+            b = offset_x * path_x + offset_y * path_y
+            discriminant = b * b - path_length_sq * c
+            if discriminant < 0.0:
+                continue
+            root = math.sqrt(discriminant)
+            t_enter = max(0.0, (-b - root) / path_length_sq)
+            t_exit = min(1.0, (-b + root) / path_length_sq)
+            if t_enter <= t_exit:
+                candidates.append((t_enter, t_exit, sprite)) # type: ignore
+
+        candidates.sort(key=lambda candidate: candidate[0])
+        t_step = 1.0
+        if path_length_sq > 0.0:
+            t_step = max(1, self._length - 1) / math.sqrt(path_length_sq)
+
+        first_hit: tuple[float, FlightCollisionSprite]|None = None
+        for t_enter, t_exit, sprite in candidates:
+            # sprites are sorted by where the laser reaches them, so none of the rest can be hit earlier
+            if first_hit is not None and t_enter >= first_hit[0]:
                 break
+
+            t = t_enter
+            while True:
+                laser_left = int(start_x + t * path_x) - self.rect.width // 2
+                laser_top = int(start_y + t * path_y) - self.rect.height // 2
+                if sprite.mask.overlap(self.mask, (laser_left - sprite.rect.left, laser_top - sprite.rect.top)) is not None:
+                    if first_hit is None or t < first_hit[0]:
+                        first_hit = (t, sprite)
+                    break
+                if t >= t_exit:
+                    break
+                t = min(t_exit, t + t_step)
+
+        return None if first_hit is None else first_hit[1]
@@ -5,6 +5,7 @@ import os
 import traceback
 
 import game
+import replay
 
 def parse_args() -> argparse.Namespace:
     logging_choices = [
@@ -17,8 +18,21 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument('-d', '--debug', action='store_true', help='enable features to aid in debugging')
     parser.add_argument('-l', '--logging', choices=logging_choices, default='INFO', help='logging level')
+    parser.add_argument('--headless', action='store_true', help='replay a session without a display as fast as possible (requires --replay, since there is no input)')
+    parser.add_argument('--frames', type=int, help='quit after simulating this many frames')
+    parser.add_argument('--seed', type=int, help='random seed (a random one is picked by default)')
+    parser.add_argument('--record', metavar='FILE', help='record the session\'s seed and inputs to a file')
+    parser.add_argument('--replay', metavar='FILE', help='replay a session recorded with --record')
+    parser.add_argument('--trace', metavar='FILE', help='write a Chrome/Perfetto trace of every frame to a file on exit')
+    parser.add_argument('--profile', action='store_true', help='run the sampling profiler from startup (F3 toggles it at any time)')
+    parser.add_argument('--timings', metavar='FILE', help='write frame timing percentiles and histograms to a file on exit')
 
     args = parser.parse_args()
+
+    # without input a headless game would sit in the setup menu forever
+    if args.headless and args.replay is None:
+        parser.error('--headless requires --replay')
+
     return args
 
 def main() -> None:
@@ -29,12 +43,28 @@ def main() -> None:
     os.makedirs(log_dir, exist_ok=True)
     logging.basicConfig(filename=os.path.join(log_dir, log_filename), filemode='w', level=args.logging)
 
+    g: game.Game|None = None
     try:
-        g = game.Game(args.debug)
-        g.mainloop()
+        input_replay = None
+        if args.replay is not None:
+            input_replay = replay.InputReplay(args.replay)
+
+        g = game.Game(args.debug, args.headless, args.seed, input_replay, args.record, args.trace, args.profile, log_dir)
+        g.mainloop(args.frames)
+        if args.timings is not None:
+            g.dump_timings(args.timings)
+        if args.headless:
+            print(f'Simulated FPS: {g.simulated_fps:.1f}')
     except:
         logger = logging.getLogger('main')
         logger.error(traceback.format_exc())
+
+        # a recording is most useful when something went wrong
+        if g is not None:
+            g.save_recording()
+            g.save_trace()
+            g.stop_profiler()
+
         raise
 
 if __name__ == '__main__':
@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+import itertools
+import numpy as np
+import pygame
+from typing import TYPE_CHECKING
+
+from asset_cache import AssetCache
+import star_background
+
+if TYPE_CHECKING:
+    from resource_loader import ResourceLoader
+
+# Backgrounds made of several layers that move at different speeds relative to the camera
+# (parallax). Nothing is rendered up front: the background is split into square chunks in
+# screen space, and a chunk is only composed from its layers when it's first needed. The
+# composed chunks are kept in an AssetCache, so restoring the background under a sprite is
+# a blit from the one to four chunks it overlaps. The camera spends most of its time at
+# (0, 0), so the view at that position is composed once in full and restored directly.
+#
+# Layers live in their own, unbounded coordinate space. A layer with a parallax factor of p
+# is shifted by camera * p, so 0 never moves and 1 moves with the foreground.
+
+class BackgroundLayer(ABC):
+    def __init__(self, parallax: float):
+        self.parallax = parallax
+
+    # draw the part of the layer inside layer_rect onto surface, with layer_rect.topleft at (0, 0)
+    @abstractmethod
+    def render(self, surface: pygame.surface.Surface, layer_rect: pygame.rect.Rect) -> None:
+        pass
+
+# Stars are generated per tile, from the layer seed and the tile coordinates, so any part of
+# the layer can be rendered on its own and always looks the same.
+class StarLayer(BackgroundLayer):
+    TILE_SIZE = 256
+
+    def __init__(self, seed: int, parallax: float, pixels_per_star: int=star_background.PIXELS_PER_STAR):
+        super().__init__(parallax)
+        self._seed = seed
+        self._pixels_per_star = pixels_per_star
+
+    def _render_tile(self, tile_x: int, tile_y: int) -> pygame.surface.Surface:
+        # the seed sequence only takes non-negative numbers
+        rng = np.random.default_rng([self._seed, tile_x % 2**32, tile_y % 2**32])
+        pixels = np.zeros((StarLayer.TILE_SIZE, StarLayer.TILE_SIZE, 3), dtype=np.uint8)
+        star_background.draw_stars(pixels, rng, self._pixels_per_star)
+
+        # only the stars are drawn over the layers below
+        tile = pygame.surfarray.make_surface(pixels)
+        tile.set_colorkey((0, 0, 0))
+        return tile
+
+    def render(self, surface: pygame.surface.Surface, layer_rect: pygame.rect.Rect) -> None:
+        tile_size = StarLayer.TILE_SIZE
+        for tile_y in range(layer_rect.top // tile_size, (layer_rect.bottom - 1) // tile_size + 1):
+            for tile_x in range(layer_rect.left // tile_size, (layer_rect.right - 1) // tile_size + 1):
+                position = (tile_x * tile_size - layer_rect.x, tile_y * tile_size - layer_rect.y)
+                surface.blit(self._render_tile(tile_x, tile_y), position)
+
+# A few images (galaxies, nebulae, ...) at fixed positions in the layer
+class ImageLayer(BackgroundLayer):
+    def __init__(self, images: list[tuple[pygame.surface.Surface, tuple[int, int]]], parallax: float):
+        super().__init__(parallax)
+        self._images = [(image, image.get_rect(topleft=position)) for image, position in images]
+
+    def render(self, surface: pygame.surface.Surface, layer_rect: pygame.rect.Rect) -> None:
+        for image, rect in self._images:
+            if rect.colliderect(layer_rect):
+                surface.blit(image, (rect.x - layer_rect.x, rect.y - layer_rect.y))
+
+class ParallaxBackground:
+    CHUNK_SIZE = 256
+
+    # chunks are keyed by this instead of id(), which can be reused while old chunks are still cached
+    _next_id = itertools.count()
+
+    def __init__(self, layers: list[BackgroundLayer], chunk_cache: AssetCache, size: tuple[int, int]):
+        self._id = next(ParallaxBackground._next_id)
+        self._layers = layers
+        self._chunk_cache = chunk_cache
+        self._camera = (0, 0)
+
+        self._home_view = pygame.surface.Surface(size)
+        self._compose(self._home_view, self._home_view.get_rect())
+
+    @property
+    def camera(self) -> tuple[int, int]:
+        return self._camera
+
+    # Moving the camera changes every chunk; the old ones are no longer looked up and are
+    # evicted from the cache over time.
+    @camera.setter
+    def camera(self, camera: tuple[int, int]) -> None:
+        self._camera = (int(camera[0]), int(camera[1]))
+
+    # draw the background inside rect (in screen space) onto surface, with rect.topleft at (0, 0)
+    def _compose(self, surface: pygame.surface.Surface, rect: pygame.rect.Rect) -> None:
+        surface.fill((0, 0, 0))
+        for layer in self._layers:
+            layer_rect = rect.move(round(self._camera[0] * layer.parallax), round(self._camera[1] * layer.parallax))
+            layer.render(surface, layer_rect)
+
+    def _chunk(self, chunk_x: int, chunk_y: int) -> pygame.surface.Surface:
+        key = ('parallax chunk', self._id, chunk_x, chunk_y, self._camera)
+        chunk = self._chunk_cache.get(key)
+        if chunk is not None:
+            return chunk
+
+        chunk_size = ParallaxBackground.CHUNK_SIZE
+        chunk = pygame.surface.Surface((chunk_size, chunk_size))
+        self._compose(chunk, pygame.rect.Rect(chunk_x * chunk_size, chunk_y * chunk_size, chunk_size, chunk_size))
+
+        self._chunk_cache.put(key, chunk)
+        return chunk
+
+    # Restores the background inside rect, which is given in the coordinates of surface. Can be
+    # passed to Group.clear.
+    def restore(self, surface: pygame.surface.Surface, rect: pygame.rect.Rect) -> None:
+        if self._camera == (0, 0):
+            surface.blit(self._home_view, rect, rect)
+            return
+
+        chunk_size = ParallaxBackground.CHUNK_SIZE
+
+        # This is called for every sprite every frame, and most sprites are much smaller than a
+        # chunk, so that case is kept to one lookup and one blit. The blit clips to the surface.
+        x, y, width, height = rect
+        chunk_x, offset_x = divmod(x, chunk_size)
+        chunk_y, offset_y = divmod(y, chunk_size)
+        if x >= 0 and y >= 0 and offset_x + width <= chunk_size and offset_y + height <= chunk_size:
+            surface.blit(self._chunk(chunk_x, chunk_y), (x, y), (offset_x, offset_y, width, height))
+            return
+
+        rect = rect.clip(surface.get_rect())
+        if rect.width == 0 or rect.height == 0:
+            return
+
+        for chunk_y in range(rect.top // chunk_size, (rect.bottom - 1) // chunk_size + 1):
+            for chunk_x in range(rect.left // chunk_size, (rect.right - 1) // chunk_size + 1):
+                chunk_rect = pygame.rect.Rect(chunk_x * chunk_size, chunk_y * chunk_size, chunk_size, chunk_size)
+                area = rect.clip(chunk_rect)
+                surface.blit(self._chunk(chunk_x, chunk_y), area, area.move(-chunk_rect.x, -chunk_rect.y))
+
+    def draw(self, surface: pygame.surface.Surface) -> None:
+        self.restore(surface, surface.get_rect())
+
+# The flight view's layers: two star fields at different depths with the galaxies and nebulae
+# in front of them. All of them are seeded from one number, so the background is the same in
+# replays.
+def create_space_layers(resource_loader: 'ResourceLoader', size: tuple[int, int], seed: int) -> list[BackgroundLayer]:
+    far_seed, near_seed, image_seed = (int(state) for state in np.random.SeedSequence(seed).generate_state(3))
+
+    rng = np.random.default_rng(image_seed)
+    images = star_background.create_galaxies(resource_loader, size, rng) + star_background.create_nebulas(resource_loader, size, rng)
+
+    # together the star fields are about as dense as a single star background
+    return [
+        StarLayer(far_seed, 0.1, star_background.PIXELS_PER_STAR * 2),
+        StarLayer(near_seed, 0.3, star_background.PIXELS_PER_STAR * 2),
+        ImageLayer(images, 0.5),
+    ]
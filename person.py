@@ -1,5 +1,6 @@
 from enum import Enum, unique
 import math
+import os
 import pygame
 from pygame.color import Color
 from typing import TYPE_CHECKING, override
@@ -26,26 +27,40 @@ class Person(Animation):
     ]
     MAX_SPEED = 70.0
 
-    _image_cache: dict[tuple[str, int], pygame.surface.Surface] = {}
+    REPLACE_COLOR = Color(63, 72, 204)
 
+    # replaces every opaque pixel of REPLACE_COLOR with the given color, in place
     @staticmethod
     def _color_image(image: pygame.surface.Surface, color: Color) -> pygame.surface.Surface:
-        replace_color = Color(63, 72, 204)
-        for x in range(image.get_width()):
-            for y in range(image.get_height()):
-                if image.get_at((x, y)) == replace_color:
-                    image.set_at((x, y), color)
+        replace_color = Person.REPLACE_COLOR
+        # the pixel arrays lock the surface, so they have to be gone before it's used again
+        rgb = pygame.surfarray.pixels3d(image)
+        alpha = pygame.surfarray.pixels_alpha(image)
+        replace = (
+            (rgb[:, :, 0] == replace_color.r)
+            & (rgb[:, :, 1] == replace_color.g)
+            & (rgb[:, :, 2] == replace_color.b)
+            & (alpha == replace_color.a)
+        )
+        rgb[replace] = (color.r, color.g, color.b)
+        alpha[replace] = color.a
+        del rgb, alpha
 
         return image
 
     @staticmethod
     def load_image(game: 'Game', name: str, color: Color) -> pygame.surface.Surface:
         color_key = (color.r << 16) | (color.g << 8) | color.b
-        image = Person._image_cache.get((name, color_key))
+        resource_loader = game.resource_loader
+        image = resource_loader.derived_images.get(('person', name, color_key))
         if image is None:
-            base_image = game.resource_loader.load_image(name)
-            image = Person._color_image(base_image.copy(), color)
-            Person._image_cache[(name, color_key)] = image
+            root, ext = os.path.splitext(name)
+            cache_name = f'{root}_{resource_loader.image_digest(name)[:16]}_{color_key:06x}{ext}'
+            image = resource_loader.load_cached_image(
+                cache_name,
+                lambda: Person._color_image(resource_loader.load_image(name).copy(), color),
+            )
+            resource_loader.derived_images.put(('person', name, color_key), image)
 
         return image
 
@@ -57,7 +72,7 @@ class Person(Animation):
             for i in range(5)
         ]
 
-        super().__init__(self._basic_images)
+        super().__init__(game, self._basic_images)
         self.rect.center = center
         self.dirty = 1
 
@@ -65,7 +80,6 @@ class Person(Animation):
         self.y = float(center[1])
 
         game.interior_view_sprites.add(self)
-        game.interior_solid_sprites.add(self)
 
         self._controller = controller
         self._state: Person.State = Person.State.Moving
@@ -101,19 +115,25 @@ class Person(Animation):
 
         self.rect.center = (int(self.x), int(self.y))
 
-        for sprite in pygame.sprite.spritecollide(self, game.interior_solid_sprites, False):
-            if last_rect.top >= sprite.rect.bottom:
-                self.rect.top = sprite.rect.bottom
+        # walls and consoles come from the ship's static grid, only other people need checking one by one
+        solid_rects = game.ship.interior_grid.query(self.rect)
+        for person in game.people_sprites:
+            if person is not self and self.rect.colliderect(person.rect):
+                solid_rects.append(person.rect)
+
+        for solid_rect in solid_rects:
+            if last_rect.top >= solid_rect.bottom:
+                self.rect.top = solid_rect.bottom
                 self.y = float(self.rect.centery)
-            elif last_rect.bottom <= sprite.rect.top:
-                self.rect.bottom = sprite.rect.top
+            elif last_rect.bottom <= solid_rect.top:
+                self.rect.bottom = solid_rect.top
                 self.y = float(self.rect.centery)
 
-            if last_rect.left >= sprite.rect.right:
-                self.rect.left = sprite.rect.right
+            if last_rect.left >= solid_rect.right:
+                self.rect.left = solid_rect.right
                 self.x = float(self.rect.centerx)
-            elif last_rect.right <= sprite.rect.left:
-                self.rect.right = sprite.rect.left
+            elif last_rect.right <= solid_rect.left:
+                self.rect.right = solid_rect.left
                 self.x = float(self.rect.centerx)
 
         if self._controller.get_activate_button():
@@ -0,0 +1,334 @@
+import numpy as np
+import numpy.typing as npt
+import pygame
+from typing import TYPE_CHECKING
+
+from spatial_hash import SpatialHashGroup
+from sprite import FlightCollisionSprite, MovingSprite, WrappingSprite
+
+if TYPE_CHECKING:
+    from game import Game
+
+FloatArray = npt.NDArray[np.float64]
+IntArray = npt.NDArray[np.int64]
+BoolArray = npt.NDArray[np.bool_]
+
+# Sprite group that keeps the positions, velocities, sizes and masses of its
+# sprites in structure-of-arrays form so the whole flight view can be integrated,
+# wrapped and checked for overlapping pairs in a few batched NumPy operations.
+# While a sprite is in the group its x, y, dx, dy, prev_x and prev_y are views into
+# these arrays (see MovingSprite), so the arrays are public.
+class PhysicsGroup(pygame.sprite.Group):
+    INITIAL_CAPACITY = 64
+
+    def __init__(self):
+        super().__init__()
+        self._bodies: list[MovingSprite] = []
+        # body indices of the overlapping pairs found by the last step; the first body of each pair
+        # is always one that checks for collisions
+        self._pair_a: IntArray = np.zeros(0, dtype=np.int64)
+        self._pair_b: IntArray = np.zeros(0, dtype=np.int64)
+        self._allocate(PhysicsGroup.INITIAL_CAPACITY)
+
+    def _allocate(self, capacity: int) -> None:
+        self.x: FloatArray = np.zeros(capacity)
+        self.y: FloatArray = np.zeros(capacity)
+        self.dx: FloatArray = np.zeros(capacity)
+        self.dy: FloatArray = np.zeros(capacity)
+        self.prev_x: FloatArray = np.zeros(capacity)
+        self.prev_y: FloatArray = np.zeros(capacity)
+        self.width: IntArray = np.zeros(capacity, dtype=np.int64)
+        self.height: IntArray = np.zeros(capacity, dtype=np.int64)
+        # sprite area is used as "mass" in collisions
+        self.mass: FloatArray = np.zeros(capacity)
+        self.wraps: BoolArray = np.zeros(capacity, dtype=np.bool_)
+        self.collides: BoolArray = np.zeros(capacity, dtype=np.bool_)
+        self.checks_collisions: BoolArray = np.zeros(capacity, dtype=np.bool_)
+
+    def _arrays(self) -> list[np.ndarray]:
+        return [
+            self.x, self.y, self.dx, self.dy, self.prev_x, self.prev_y,
+            self.width, self.height, self.mass, self.wraps, self.collides, self.checks_collisions,
+        ]
+
+    def _grow(self) -> None:
+        old_arrays = self._arrays()
+        self._allocate(len(self.x) * 2)
+        for new_array, old_array in zip(self._arrays(), old_arrays):
+            new_array[:len(old_array)] = old_array
+
+    @property
+    def num_bodies(self) -> int:
+        return len(self._bodies)
+
+    # only valid until a body is added or removed
+    @property
+    def pairs(self) -> list[tuple[MovingSprite, MovingSprite]]:
+        bodies = self._bodies
+        return [(bodies[i], bodies[j]) for i, j in zip(self._pair_a.tolist(), self._pair_b.tolist())]
+
+    def add_internal(self, sprite, layer=None) -> None:
+        super().add_internal(sprite, layer)
+
+        index = len(self._bodies)
+        if index >= len(self.x):
+            self._grow()
+
+        self.x[index] = sprite._x
+        self.y[index] = sprite._y
+        self.dx[index] = sprite._dx
+        self.dy[index] = sprite._dy
+        self.prev_x[index] = sprite._prev_x
+        self.prev_y[index] = sprite._prev_y
+        self.width[index] = sprite.rect.width
+        self.height[index] = sprite.rect.height
+        self.mass[index] = sprite.rect.width * sprite.rect.height
+        self.wraps[index] = isinstance(sprite, WrappingSprite)
+        self.collides[index] = isinstance(sprite, FlightCollisionSprite)
+        self.checks_collisions[index] = self.collides[index] and sprite.checks_collisions
+
+        self._bodies.append(sprite)
+        sprite._physics = self
+        sprite._body_index = index
+
+    def remove_internal(self, sprite) -> None:
+        super().remove_internal(sprite)
+
+        # hand the state back to the sprite so it keeps working outside the group
+        index = sprite._body_index
+        sprite._x = float(self.x[index])
+        sprite._y = float(self.y[index])
+        sprite._dx = float(self.dx[index])
+        sprite._dy = float(self.dy[index])
+        sprite._prev_x = float(self.prev_x[index])
+        sprite._prev_y = float(self.prev_y[index])
+        sprite._physics = None
+        sprite._body_index = -1
+
+        # keep the arrays dense by moving the last body into the hole
+        last_index = len(self._bodies) - 1
+        if index != last_index:
+            for array in self._arrays():
+                array[index] = array[last_index]
+            last_sprite = self._bodies[last_index]
+            self._bodies[index] = last_sprite
+            last_sprite._body_index = index
+        self._bodies.pop()
+
+    # cell ranges of the bodies' rects for the given centers, matching SpatialHashGroup._cell_range()
+    def _cell_ranges(self, center_x: IntArray, center_y: IntArray, cell_size: int) -> IntArray:
+        num_bodies = len(self._bodies)
+        width = self.width[:num_bodies]
+        height = self.height[:num_bodies]
+        left = center_x - width // 2
+        top = center_y - height // 2
+        return np.stack([
+            left // cell_size,
+            top // cell_size,
+            (left + width - 1) // cell_size,
+            (top + height - 1) // cell_size,
+        ])
+
+    # advance every body by one tick, wrapping the ones that wrap around the view
+    def step(self, frame_time: float, view_size: tuple[int, int], spatial_hash: SpatialHashGroup) -> None:
+        num_bodies = len(self._bodies)
+        if num_bodies == 0:
+            self._pair_a = np.zeros(0, dtype=np.int64)
+            self._pair_b = np.zeros(0, dtype=np.int64)
+            return
+
+        x = self.x[:num_bodies]
+        y = self.y[:num_bodies]
+        half_width = self.width[:num_bodies] / 2
+        half_height = self.height[:num_bodies] / 2
+        wraps = self.wraps[:num_bodies]
+
+        self.prev_x[:num_bodies] = x
+        self.prev_y[:num_bodies] = y
+        old_center_x = x.astype(np.int64)
+        old_center_y = y.astype(np.int64)
+
+        x += self.dx[:num_bodies] * frame_time
+        y += self.dy[:num_bodies] * frame_time
+
+        # wrap around if a body goes completely past an edge of the view
+        view_width, view_height = view_size
+        np.copyto(y, -half_height, where=wraps & (y - half_height >= view_height))
+        np.copyto(y, view_height + half_height, where=wraps & (y + half_height <= 0.0))
+        np.copyto(x, -half_width, where=wraps & (x - half_width >= view_width))
+        np.copyto(x, view_width + half_width, where=wraps & (x + half_width <= 0.0))
+
+        center_x = x.astype(np.int64)
+        center_y = y.astype(np.int64)
+        for sprite, cx, cy in zip(self._bodies, center_x.tolist(), center_y.tolist()):
+            sprite.rect.center = (cx, cy)
+
+        # only re-bucket the bodies that ended up in different cells
+        cell_size = spatial_hash.cell_size
+        old_ranges = self._cell_ranges(old_center_x, old_center_y, cell_size)
+        new_ranges = self._cell_ranges(center_x, center_y, cell_size)
+        changed = np.any(old_ranges != new_ranges, axis=0) & self.collides[:num_bodies]
+        for index in np.flatnonzero(changed).tolist():
+            spatial_hash.move(self._bodies[index])
+
+        self._find_pairs(center_x, center_y)
+
+    # find every overlapping pair that involves a body that checks for collisions. There are only
+    # ever a few of those (the ships), so testing each of them against every body at once scales
+    # linearly with the number of bodies.
+    def _find_pairs(self, center_x: IntArray, center_y: IntArray) -> None:
+        num_bodies = len(self._bodies)
+        width = self.width[:num_bodies]
+        height = self.height[:num_bodies]
+        left = center_x - width // 2
+        top = center_y - height // 2
+        right = left + width
+        bottom = top + height
+
+        checkers = np.flatnonzero(self.checks_collisions[:num_bodies])
+        overlapping = (
+            self.collides[:num_bodies] &
+            (left < right[checkers, np.newaxis]) & (left[checkers, np.newaxis] < right) &
+            (top < bottom[checkers, np.newaxis]) & (top[checkers, np.newaxis] < bottom)
+        )
+        checker_rows, b = np.nonzero(overlapping)
+        a = checkers[checker_rows]
+
+        # don't pair a body with itself, and only keep one of the two copies of a pair of checkers
+        keep = (a != b) & ~(self.checks_collisions[b] & (b < a))
+        self._pair_a = a[keep]
+        self._pair_b = b[keep]
+
+    # Bounce every pair found by the last step off each other with elastic collisions, using
+    # sprite area as mass, and push the body that checked for the collision out of the other
+    # one. Once all the pairs are resolved, on_collide() is called on both bodies of each pair.
+    # This must be called right after step(), before any bodies are added or removed.
+    def solve_collisions(self, game: 'Game', spatial_hash: SpatialHashGroup) -> None:
+        a = self._pair_a
+        b = self._pair_b
+        if len(a) == 0:
+            return
+
+        num_bodies = len(self._bodies)
+        x = self.x[:num_bodies]
+        y = self.y[:num_bodies]
+        dx = self.dx[:num_bodies]
+        dy = self.dy[:num_bodies]
+
+        # Work in a frame where the x axis points from a to b so the collision only changes the x
+        # components. The sine and cosine of that angle are just the normalized offset between the
+        # bodies (with bodies on top of each other pushing along x, like atan2(0, 0) = 0).
+        x_diff = x[b] - x[a]
+        y_diff = y[b] - y[a]
+        distance = np.hypot(x_diff, y_diff)
+        apart = distance > 0.0
+        safe_distance = np.where(apart, distance, 1.0)
+        cos_angle = np.where(apart, x_diff / safe_distance, 1.0)
+        sin_angle = np.where(apart, y_diff / safe_distance, 0.0)
+
+        a_vx = dx[a] * cos_angle - dy[a] * sin_angle
+        a_vy = dx[a] * sin_angle + dy[a] * cos_angle
+        b_vx = dx[b] * cos_angle - dy[b] * sin_angle
+        b_vy = dx[b] * sin_angle + dy[b] * cos_angle
+
+        # elastic collision equations
+        a_mass = self.mass[a]
+        b_mass = self.mass[b]
+        mass_sum = a_mass + b_mass
+        a_new_vx = (a_mass - b_mass) / mass_sum * a_vx + 2 * b_mass / mass_sum * b_vx
+        b_new_vx = 2 * a_mass / mass_sum * a_vx + (b_mass - a_mass) / mass_sum * b_vx
+        force = a_mass * np.abs(a_new_vx - a_vx)
+
+        # rotate back, and add up the changes for bodies that are in more than one pair
+        delta_dx = np.zeros(num_bodies)
+        delta_dy = np.zeros(num_bodies)
+        np.add.at(delta_dx, a, a_new_vx * cos_angle + a_vy * sin_angle - dx[a])
+        np.add.at(delta_dy, a, -a_new_vx * sin_angle + a_vy * cos_angle - dy[a])
+        np.add.at(delta_dx, b, b_new_vx * cos_angle + b_vy * sin_angle - dx[b])
+        np.add.at(delta_dy, b, -b_new_vx * sin_angle + b_vy * cos_angle - dy[b])
+        new_dx = dx + delta_dx
+        new_dy = dy + delta_dy
+
+        # the checking body takes its new velocity directly, the other body is given it in on_collide()
+        dx[a] = new_dx[a]
+        dy[a] = new_dy[a]
+
+        self._separate(a, b, spatial_hash)
+
+        # the callbacks can remove bodies, so get everything they need before calling any of them
+        bodies = self._bodies
+        collisions = zip(
+            [bodies[i] for i in a.tolist()],
+            [bodies[i] for i in b.tolist()],
+            new_dx[a].tolist(),
+            new_dy[a].tolist(),
+            new_dx[b].tolist(),
+            new_dy[b].tolist(),
+            force.tolist(),
+        )
+        for sprite_a, sprite_b, a_dx, a_dy, b_dx, b_dy, pair_force in collisions:
+            # skip pairs where a body was destroyed by an earlier collision
+            if sprite_a._physics is not self or sprite_b._physics is not self:
+                continue
+
+            sprite_b.on_collide(game, b_dx, b_dy, pair_force)
+            sprite_a.on_collide(game, a_dx, a_dy, pair_force)
+
+    # move the first body of each pair to the edge of the second along the axis they overlap least on
+    def _separate(self, a: IntArray, b: IntArray, spatial_hash: SpatialHashGroup) -> None:
+        num_bodies = len(self._bodies)
+        center_x = self.x[:num_bodies].astype(np.int64)
+        center_y = self.y[:num_bodies].astype(np.int64)
+        width = self.width[:num_bodies]
+        height = self.height[:num_bodies]
+        left = center_x - width // 2
+        top = center_y - height // 2
+        right = left + width
+        bottom = top + height
+
+        vertical = np.abs(left[b] - left[a]) < np.abs(top[b] - top[a])
+        offset_x = np.where(vertical, 0, np.where(left[a] < left[b], left[b] - right[a], right[b] - left[a]))
+        offset_y = np.where(vertical, np.where(top[a] < top[b], top[b] - bottom[a], bottom[b] - top[a]), 0)
+
+        # if a body is pushed by several others, use the biggest push in each direction
+        push_x = np.zeros(num_bodies, dtype=np.int64)
+        push_y = np.zeros(num_bodies, dtype=np.int64)
+        pull_x = np.zeros(num_bodies, dtype=np.int64)
+        pull_y = np.zeros(num_bodies, dtype=np.int64)
+        np.maximum.at(push_x, a, np.maximum(offset_x, 0))
+        np.maximum.at(push_y, a, np.maximum(offset_y, 0))
+        np.minimum.at(pull_x, a, np.minimum(offset_x, 0))
+        np.minimum.at(pull_y, a, np.minimum(offset_y, 0))
+        total_x = push_x + pull_x
+        total_y = push_y + pull_y
+
+        moved_x = np.flatnonzero(total_x)
+        moved_y = np.flatnonzero(total_y)
+        self.x[moved_x] = center_x[moved_x] + total_x[moved_x]
+        self.y[moved_y] = center_y[moved_y] + total_y[moved_y]
+
+        for index in np.union1d(moved_x, moved_y).tolist():
+            sprite = self._bodies[index]
+            sprite.rect.center = (int(self.x[index]), int(self.y[index]))
+            spatial_hash.move(sprite)
+
+    # centers to draw each moving body at, a fraction alpha of the way through the last tick
+    def interpolated_centers(self, alpha: float, view_size: tuple[int, int]) -> list[tuple[MovingSprite, tuple[int, int]]]:
+        num_bodies = len(self._bodies)
+        if num_bodies == 0:
+            return []
+
+        x = self.x[:num_bodies]
+        y = self.y[:num_bodies]
+        x_diff = x - self.prev_x[:num_bodies]
+        y_diff = y - self.prev_y[:num_bodies]
+
+        # don't interpolate across the view if the body wrapped around
+        wrapped = (np.abs(x_diff) > view_size[0] / 2) | (np.abs(y_diff) > view_size[1] / 2)
+        center_x = np.where(wrapped, x, self.prev_x[:num_bodies] + x_diff * alpha).astype(np.int64)
+        center_y = np.where(wrapped, y, self.prev_y[:num_bodies] + y_diff * alpha).astype(np.int64)
+
+        return [
+            (sprite, (cx, cy))
+            for sprite, cx, cy in zip(self._bodies, center_x.tolist(), center_y.tolist())
+        ]
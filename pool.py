@@ -0,0 +1,85 @@
+from collections.abc import Callable
+import logging
+from typing import Generic, TypeVar
+
+T = TypeVar('T')
+
+# Keeps released objects around so they can be reset and reused instead of being
+# allocated again. Released objects only become available again after recycle()
+# (called by the game once per tick), so an object released in the middle of an
+# update can't be handed out while something is still iterating over it.
+class Pool(Generic[T]):
+    DEFAULT_MAX_FREE = 1000
+
+    def __init__(self, name: str, factory: Callable[[], T], max_free: int=DEFAULT_MAX_FREE):
+        self._name = name
+        self._factory = factory
+        self._max_free = max_free
+        self._logger = logging.getLogger('Pool')
+
+        self._free: list[T] = []
+        self._released: list[T] = []
+        # keyed by id so objects that define __eq__/__hash__ don't matter
+        self._in_use: dict[int, T] = {}
+
+        self._num_created = 0
+        self._num_reused = 0
+        self._peak_in_use = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def num_free(self) -> int:
+        return len(self._free)
+
+    @property
+    def num_in_use(self) -> int:
+        return len(self._in_use)
+
+    @property
+    def num_created(self) -> int:
+        return self._num_created
+
+    @property
+    def num_reused(self) -> int:
+        return self._num_reused
+
+    @property
+    def peak_in_use(self) -> int:
+        return self._peak_in_use
+
+    def acquire(self) -> T:
+        if len(self._free) > 0:
+            obj = self._free.pop()
+            self._num_reused += 1
+        else:
+            obj = self._factory()
+            self._num_created += 1
+
+        self._in_use[id(obj)] = obj
+        self._peak_in_use = max(self._peak_in_use, len(self._in_use))
+        return obj
+
+    def release(self, obj: T) -> None:
+        if self._in_use.pop(id(obj), None) is None:
+            self._logger.warning(f'{self._name} released when it is not in use')
+            return
+
+        self._released.append(obj)
+
+    # make the objects released since the last call available again
+    def recycle(self) -> None:
+        free_space = self._max_free - len(self._free)
+        self._free += self._released[:free_space]
+        self._released.clear()
+
+    # take back every object, e.g. when everything has been removed from the sprite groups
+    def release_all(self) -> None:
+        self._released += self._in_use.values()
+        self._in_use.clear()
+        self.recycle()
+
+    def stats_string(self) -> str:
+        return f'{self._name}: {self.num_in_use} in use, {self.num_free} free, {self._peak_in_use} peak, {self._num_created} created, {self._num_reused} reused'
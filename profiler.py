@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+from types import FrameType
+
+# Low-overhead sampling profiler. A background thread periodically grabs the main
+# thread's Python stack and counts identical stacks, prefixed with the frame phase
+# the game was in. The results are written in the collapsed stack format used by
+# flamegraph.pl, speedscope, etc.
+class SamplingProfiler:
+    DEFAULT_INTERVAL = 0.002 # seconds
+    SWITCH_INTERVAL = 0.00005 # seconds
+
+    def __init__(self, interval: float=DEFAULT_INTERVAL):
+        self._interval = interval
+        self._thread_id = threading.get_ident()
+        self._thread: threading.Thread|None = None
+        self._stop_event = threading.Event()
+        self._stacks: dict[str, int] = {}
+        self._num_samples = 0
+        self._old_switch_interval = sys.getswitchinterval()
+
+        # the phase stack is kept up to date even when not sampling so starting mid-frame works;
+        # it is only changed by the profiled thread and the sampler only reads the joined string
+        self._phases: list[str] = []
+        self._phase = ''
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def num_samples(self) -> int:
+        return self._num_samples
+
+    def push_phase(self, name: str) -> None:
+        self._phases.append(name)
+        self._phase = ';'.join(self._phases)
+
+    def pop_phase(self) -> None:
+        self._phases.pop()
+        self._phase = ';'.join(self._phases)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._stacks.clear()
+        self._num_samples = 0
+        self._stop_event.clear()
+
+        # the sampler can only run when the main thread gives up the GIL, so without this almost every
+        # sample would land in whatever C call releases it next (e.g. pygame.display.update). A forced
+        # switch only happens when the sampler is waiting, so a short interval costs very little.
+        self._old_switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SamplingProfiler.SWITCH_INTERVAL)
+
+        self._thread = threading.Thread(target=self._run, name='SamplingProfiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        sys.setswitchinterval(self._old_switch_interval)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._sample(frame)
+
+    def _sample(self, frame: FrameType) -> None:
+        names: list[str] = []
+        current: FrameType|None = frame
+        while current is not None:
+            code = current.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            current = current.f_back
+        names.reverse()
+
+        phase = self._phase
+        if phase == '':
+            phase = 'no phase'
+        stack = phase + ';' + ';'.join(names)
+
+        self._stacks[stack] = self._stacks.get(stack, 0) + 1
+        self._num_samples += 1
+
+    def save(self, filename: str) -> None:
+        with open(filename, 'w') as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f'{stack} {count}\n')
@@ -0,0 +1,118 @@
+from collections.abc import Callable
+import pygame
+
+# A LayeredDirty group that finds out by itself which sprites need to be redrawn, so only
+# the areas that changed are restored and blitted. Sprite marks itself dirty when its image
+# is replaced; moving a sprite usually changes its rect in place, which can't be noticed
+# when it happens, so before drawing every sprite's rect is compared with where it was
+# last drawn.
+#
+# Unlike LayeredDirty, the background can also be a function that restores an area of the
+# surface (like Group.clear), and it always draws in dirty rect mode: whether to update the
+# whole display is decided later, by DirtyRectCoalescer. Without a background nothing is
+# restored, for groups drawn over others that repaint the areas in changed_rects().
+#
+# Only LayeredDirty's layer ordering and bookkeeping (sprites(), spritedict, lostsprites)
+# are used; the dirty rect pass itself is done here, so it doesn't depend on pygame's
+# private helpers. A sprite that was never drawn has an empty rect in spritedict.
+class AutoDirtyGroup(pygame.sprite.LayeredDirty):
+    def __init__(self, *sprites: pygame.sprite.DirtySprite):
+        super().__init__(*sprites)
+        self._restore: Callable[[pygame.surface.Surface, pygame.rect.Rect], object]|None = None
+
+    def clear(self, surface: pygame.surface.Surface, bgd: pygame.surface.Surface|Callable[[pygame.surface.Surface, pygame.rect.Rect], object]) -> None:
+        if callable(bgd):
+            self._restore = bgd
+        else:
+            self._restore = lambda surface, rect: surface.blit(bgd, rect, rect)
+
+    @staticmethod
+    def _sprite_rect(sprite: pygame.sprite.DirtySprite) -> pygame.rect.Rect:
+        if sprite.source_rect is not None:
+            return pygame.rect.Rect(sprite.rect.topleft, sprite.source_rect.size)
+        return sprite.rect
+
+    def _mark_moved_sprites(self, sprites: list[pygame.sprite.DirtySprite], clip: pygame.rect.Rect) -> None:
+        drawn_rects = self.spritedict
+        for sprite in sprites:
+            if sprite.dirty == 0 and sprite.visible:
+                rect = self._sprite_rect(sprite)
+                drawn_rect = drawn_rects[sprite]
+                # the drawn rect is clipped to the surface, so sprites at the edges need a second look
+                if rect != drawn_rect and rect.clip(clip) != drawn_rect:
+                    sprite.dirty = 1
+
+    # Merges rect with the update areas it overlaps, so no area is restored or blitted twice.
+    @staticmethod
+    def _add_area(update: list[pygame.rect.Rect], rect: pygame.rect.Rect, clip: pygame.rect.Rect) -> None:
+        area = pygame.rect.Rect(rect)
+        i = area.collidelist(update)
+        while i > -1:
+            area.union_ip(update[i])
+            del update[i]
+            i = area.collidelist(update)
+        update.append(area.clip(clip))
+
+    def _dirty_areas(self, sprites: list[pygame.sprite.DirtySprite], clip: pygame.rect.Rect) -> list[pygame.rect.Rect]:
+        self._mark_moved_sprites(sprites, clip)
+
+        update = list(self.lostsprites)
+        self.lostsprites.clear()
+        drawn_rects = self.spritedict
+        for sprite in sprites:
+            if sprite.dirty > 0:
+                self._add_area(update, self._sprite_rect(sprite), clip)
+                if drawn_rects[sprite]:
+                    self._add_area(update, drawn_rects[sprite], clip)
+        return update
+
+    # The areas the next draw will restore from the background, in the coordinates of surface.
+    # Groups drawn underneath need to repaint them.
+    def changed_rects(self, surface: pygame.surface.Surface) -> list[pygame.rect.Rect]:
+        clip = surface.get_clip()
+        sprites = self.sprites()
+        self._mark_moved_sprites(sprites, clip)
+
+        rects = list(self.lostsprites)
+        drawn_rects = self.spritedict
+        for sprite in sprites:
+            if sprite.dirty > 0:
+                rects.append(self._sprite_rect(sprite).clip(clip))
+                if drawn_rects[sprite]:
+                    rects.append(drawn_rects[sprite])
+        return rects
+
+    def draw(self, surface: pygame.surface.Surface, bgsurf: pygame.surface.Surface|None=None, special_flags: int|None=None) -> list[pygame.rect.Rect]:
+        if bgsurf is not None:
+            self.clear(surface, bgsurf)
+
+        clip = surface.get_clip()
+        sprites = self.sprites()
+        update = self._dirty_areas(sprites, clip)
+        if self._restore is not None:
+            for rect in update:
+                self._restore(surface, rect)
+
+        # dirty sprites are drawn whole, the others only where they overlap a restored area
+        blit = surface.blit
+        drawn_rects = self.spritedict
+        for sprite in sprites:
+            flags = sprite.blendmode if special_flags is None else special_flags
+            if sprite.dirty > 0:
+                if sprite.visible:
+                    drawn_rects[sprite] = blit(sprite.image, sprite.rect, sprite.source_rect, flags)
+                if sprite.dirty == 1:
+                    sprite.dirty = 0
+            elif sprite.visible:
+                rect = self._sprite_rect(sprite)
+                if sprite.source_rect is not None:
+                    offset_x = sprite.source_rect.x - rect.x
+                    offset_y = sprite.source_rect.y - rect.y
+                else:
+                    offset_x = -rect.x
+                    offset_y = -rect.y
+                for i in rect.collidelistall(update):
+                    area = rect.clip(update[i])
+                    blit(sprite.image, area, (area.x + offset_x, area.y + offset_y, area.w, area.h), flags)
+
+        return update
@@ -0,0 +1,188 @@
+import struct
+import zlib
+
+from controller import Controller
+
+# File layout (little endian):
+#   header:  magic, version, seed, display width, display height, tick rate, number of GUIDs
+#   GUIDs:   32 byte ASCII strings, referenced by index from the tick records
+#   ticks:   zlib compressed stream of tick records
+#
+# Each tick record is the number of controllers followed by one controller record per
+# controller. Axes are stored the same way SDL reports them (16-bit integers), so a
+# replayed session sees exactly the same values as the recorded one.
+
+MAGIC = b'G5RP'
+# version 2: the star backgrounds use different random numbers, so older replays would play back differently
+VERSION = 2
+
+HEADER_STRUCT = struct.Struct('<4sHQHHdH')
+GUID_STRUCT = struct.Struct('<32s')
+TICK_STRUCT = struct.Struct('<B')
+CONTROLLER_STRUCT = struct.Struct('<BhhI')
+
+NUM_AXES = 2
+MAX_BUTTONS = 32
+AXIS_SCALE = 32768.0
+
+def _axis_to_int(value: float) -> int:
+    return max(-32768, min(32767, round(value * AXIS_SCALE)))
+
+class RecordedJoystick:
+    def __init__(self, guid: str):
+        self._guid = guid
+        self._axes = [0] * NUM_AXES
+        self._buttons = 0
+
+    def set_state(self, axes: tuple[int, int], buttons: int) -> None:
+        self._axes[0], self._axes[1] = axes
+        self._buttons = buttons
+
+    def get_guid(self) -> str:
+        return self._guid
+
+    def get_axis(self, axis_number: int) -> float:
+        if axis_number < NUM_AXES:
+            return self._axes[axis_number] / AXIS_SCALE
+        return 0.0
+
+    def get_button(self, button: int) -> bool:
+        return (self._buttons >> button) & 1 == 1
+
+class InputRecorder:
+    def __init__(self, filename: str, seed: int, display_size: tuple[int, int], tick_rate: float):
+        self._filename = filename
+        self._seed = seed
+        self._display_size = display_size
+        self._tick_rate = tick_rate
+        self._guids: list[str] = []
+        self._guid_indices: dict[str, int] = {}
+        self._ticks = bytearray()
+        self._num_ticks = 0
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def num_ticks(self) -> int:
+        return self._num_ticks
+
+    def _get_guid_index(self, guid: str) -> int:
+        index = self._guid_indices.get(guid)
+        if index is None:
+            index = len(self._guids)
+            self._guids.append(guid)
+            self._guid_indices[guid] = index
+        return index
+
+    def record_tick(self, joysticks: list) -> None:
+        self._ticks += TICK_STRUCT.pack(len(joysticks))
+        for joystick in joysticks:
+            guid_index = self._get_guid_index(joystick.get_guid())
+            axes = [_axis_to_int(joystick.get_axis(i)) for i in range(min(NUM_AXES, joystick.get_numaxes()))]
+            axes += [0] * (NUM_AXES - len(axes))
+
+            buttons = 0
+            for i in range(min(MAX_BUTTONS, joystick.get_numbuttons())):
+                if joystick.get_button(i):
+                    buttons |= 1 << i
+
+            self._ticks += CONTROLLER_STRUCT.pack(guid_index, axes[0], axes[1], buttons)
+
+        self._num_ticks += 1
+
+    def save(self) -> None:
+        with open(self._filename, 'wb') as f:
+            f.write(HEADER_STRUCT.pack(
+                MAGIC,
+                VERSION,
+                self._seed,
+                self._display_size[0],
+                self._display_size[1],
+                self._tick_rate,
+                len(self._guids),
+            ))
+            for guid in self._guids:
+                f.write(GUID_STRUCT.pack(guid.encode('ascii')))
+            f.write(zlib.compress(bytes(self._ticks)))
+
+class InputReplay:
+    def __init__(self, filename: str):
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+        if len(data) < HEADER_STRUCT.size:
+            raise ValueError(f'Replay file "{filename}" is too short')
+
+        magic, version, seed, width, height, tick_rate, num_guids = HEADER_STRUCT.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f'"{filename}" is not a replay file')
+        if version != VERSION:
+            raise ValueError(f'Unsupported replay file version: {version}')
+
+        self._seed: int = seed
+        self._display_size = (width, height)
+        self._tick_rate: float = tick_rate
+
+        offset = HEADER_STRUCT.size
+        self._guids: list[str] = []
+        for _ in range(num_guids):
+            guid_bytes, = GUID_STRUCT.unpack_from(data, offset)
+            self._guids.append(guid_bytes.rstrip(b'\0').decode('ascii'))
+            offset += GUID_STRUCT.size
+
+        self._ticks = zlib.decompress(data[offset:])
+        self._offset = 0
+        self._num_ticks_played = 0
+
+        # each controller slot keeps the same Controller object for as long as the
+        # same device is in it, just like the live joysticks
+        self._joysticks: list[RecordedJoystick] = []
+
+    @property
+    def seed(self) -> int:
+        return self._seed
+
+    @property
+    def display_size(self) -> tuple[int, int]:
+        return self._display_size
+
+    @property
+    def tick_rate(self) -> float:
+        return self._tick_rate
+
+    @property
+    def num_ticks_played(self) -> int:
+        return self._num_ticks_played
+
+    @property
+    def finished(self) -> bool:
+        return self._offset >= len(self._ticks)
+
+    # updates the controllers list in place with the state for the next tick
+    def play_tick(self, controllers: list[Controller]) -> None:
+        num_controllers, = TICK_STRUCT.unpack_from(self._ticks, self._offset)
+        self._offset += TICK_STRUCT.size
+
+        del self._joysticks[num_controllers:]
+        del controllers[num_controllers:]
+
+        for i in range(num_controllers):
+            guid_index, axis0, axis1, buttons = CONTROLLER_STRUCT.unpack_from(self._ticks, self._offset)
+            self._offset += CONTROLLER_STRUCT.size
+
+            guid = self._guids[guid_index]
+            if i >= len(self._joysticks) or self._joysticks[i].get_guid() != guid:
+                joystick = RecordedJoystick(guid)
+                controller = Controller(joystick) # type: ignore
+                if i < len(self._joysticks):
+                    self._joysticks[i] = joystick
+                    controllers[i] = controller
+                else:
+                    self._joysticks.append(joystick)
+                    controllers.append(controller)
+
+            self._joysticks[i].set_state((axis0, axis1), buttons)
+
+        self._num_ticks_played += 1
@@ -1,17 +1,274 @@
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+import hashlib
+import logging
 import os
 import pygame
+import threading
+import time
+
+from asset_cache import AssetCache, mask_bytes, sound_bytes, surface_bytes
+from atlas import TextureAtlas
+from rotation_cache import RotationCache
+from ship_layout import ShipLayout, load_layout
+
+MANIFEST_FILENAME = 'assets.manifest'
 
 class ResourceLoader:
-    def __init__(self):
-        self._image_cache: dict[str, pygame.surface.Surface] = {}
-        self._sound_cache: dict[str, pygame.mixer.Sound] = {}
+    DEFAULT_DERIVED_IMAGE_MAX_BYTES = 16 * 1024 * 1024
+    DEFAULT_MASK_MAX_BYTES = 4 * 1024 * 1024
+    DEFAULT_TEXT_MAX_BYTES = 4 * 1024 * 1024
+    # enough for every chunk of a 4K flight view
+    DEFAULT_BACKGROUND_CHUNK_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(
+            self,
+            cache_dir: str='cache',
+            strict: bool=False,
+            rotation_max_bytes: int=RotationCache.DEFAULT_MAX_BYTES,
+            derived_image_max_bytes: int=DEFAULT_DERIVED_IMAGE_MAX_BYTES,
+            mask_max_bytes: int=DEFAULT_MASK_MAX_BYTES,
+            background_chunk_max_bytes: int=DEFAULT_BACKGROUND_CHUNK_MAX_BYTES,
+            text_max_bytes: int=DEFAULT_TEXT_MAX_BYTES,
+        ):
+        self._cache_dir = cache_dir
+        self._logger = logging.getLogger('ResourceLoader')
+
+        # When I/O isn't allowed (while the game is updating sprites), loading anything that
+        # isn't cached yet is a bug: it's logged, and fails outright in strict mode.
+        self._strict = strict
+        self._io_allowed = True
+
+        # Assets loaded from files are never evicted, their caches only keep count. Assets
+        # derived from them can always be recreated, so they're kept within a budget.
+        self._atlas: TextureAtlas|None = None
+        self._atlas_pages: AssetCache[int, pygame.surface.Surface] = AssetCache('Atlas pages', surface_bytes)
+        self._image_cache: AssetCache[str, pygame.surface.Surface] = AssetCache('Images', surface_bytes)
+        self._sound_cache: AssetCache[str, pygame.mixer.Sound] = AssetCache('Sounds', sound_bytes)
+        self._derived_image_cache: AssetCache[Hashable, pygame.surface.Surface] = AssetCache('Derived images', surface_bytes, derived_image_max_bytes)
+        self._background_chunk_cache: AssetCache[Hashable, pygame.surface.Surface] = AssetCache('Background chunks', surface_bytes, background_chunk_max_bytes)
+        self._ship_layout_cache: dict[str, ShipLayout] = {}
+        self._image_digests: dict[str, str] = {}
+
+        # Assets from the manifest are decoded by a worker thread and handed over in
+        # update_preload(), because converting images for the display has to happen on the
+        # main thread. Only the worker appends to _preloaded and only the main thread takes from it.
+        self._preload_thread: threading.Thread|None = None
+        self._preload_lock = threading.Lock()
+        self._preloaded: list[tuple[str, str, pygame.surface.Surface|pygame.mixer.Sound|None]] = []
+        self._preload_total = 0
+        self._preload_done = 0
+        self._preload_start_time = 0.0
+
+        self._rotation_cache = RotationCache(rotation_max_bytes)
+
+        # masks of unrotated images, keyed by surface id. The surface is kept alongside
+        # its mask so the id can't be reused while the entry exists.
+        self._mask_cache: AssetCache[int, tuple[pygame.surface.Surface, pygame.mask.Mask]] = AssetCache(
+            'Masks',
+            lambda entry: mask_bytes(entry[1]),
+            mask_max_bytes,
+        )
+
+        # rendered text, keyed by font id, text, antialiasing and color. The font is kept
+        # alongside the surface for the same reason as with masks.
+        self._text_cache: AssetCache[tuple[int, str, bool, tuple[int, int, int, int]], tuple[pygame.font.Font, pygame.surface.Surface]] = AssetCache(
+            'Text',
+            lambda entry: surface_bytes(entry[1]),
+            text_max_bytes,
+        )
+
+    @property
+    def rotation_cache(self) -> RotationCache:
+        return self._rotation_cache
+
+    # images made from loaded ones, e.g. recoloured, keyed by whatever identifies them to their creator
+    @property
+    def derived_images(self) -> AssetCache[Hashable, pygame.surface.Surface]:
+        return self._derived_image_cache
+
+    # composed chunks of parallax backgrounds, see ParallaxBackground
+    @property
+    def background_chunks(self) -> AssetCache[Hashable, pygame.surface.Surface]:
+        return self._background_chunk_cache
+
+    @property
+    def caches(self) -> list[AssetCache]:
+        return [
+            self._atlas_pages,
+            self._image_cache,
+            self._sound_cache,
+            self._derived_image_cache,
+            self._background_chunk_cache,
+            self._rotation_cache.cache,
+            self._mask_cache,
+            self._text_cache,
+        ]
+
+    @property
+    def num_bytes(self) -> int:
+        return sum(cache.num_bytes for cache in self.caches)
+
+    @property
+    def io_allowed(self) -> bool:
+        return self._io_allowed
+
+    @io_allowed.setter
+    def io_allowed(self, allowed: bool) -> None:
+        self._io_allowed = allowed
+
+    # allow I/O for the duration of a loading point, e.g. starting a mission
+    @contextmanager
+    def loading(self) -> Iterator[None]:
+        old_io_allowed = self._io_allowed
+        self._io_allowed = True
+        try:
+            yield
+        finally:
+            self._io_allowed = old_io_allowed
+
+    def _check_io(self, filename: str) -> None:
+        if not self._io_allowed:
+            message = f'Synchronous load of {filename} while I/O is not allowed'
+            self._logger.warning(message)
+            assert not self._strict, message
+
+    @property
+    def atlas(self) -> TextureAtlas|None:
+        return self._atlas
+
+    # once the atlas is loaded, load_image() returns the images in it as subsurfaces of its pages
+    def load_atlas(self) -> None:
+        self._atlas = TextureAtlas.load('images', os.path.join(self._cache_dir, 'atlas'))
+        for i, page in enumerate(self._atlas.pages):
+            self._atlas_pages.put(i, page)
+
+    @property
+    def preloading(self) -> bool:
+        return self._preload_done < self._preload_total
+
+    # fraction of the manifest that has been loaded, 1.0 if nothing is being preloaded
+    @property
+    def preload_progress(self) -> float:
+        if self._preload_total == 0:
+            return 1.0
+        return self._preload_done / self._preload_total
+
+    def start_preload(self, manifest_filename: str=MANIFEST_FILENAME) -> None:
+        if self._preload_thread is not None:
+            return
+
+        entries: list[tuple[str, str]] = []
+        with open(manifest_filename) as f:
+            for line_number, line in enumerate(f, 1):
+                words = line.split('#', 1)[0].split()
+                if len(words) == 0:
+                    continue
+                if len(words) != 2 or words[0] not in ('image', 'sound'):
+                    raise ValueError(f'{manifest_filename}:{line_number}: expected "image <name>" or "sound <name>"')
+                # images in the atlas are already loaded
+                if words[0] == 'image' and self._atlas is not None and words[1] in self._atlas:
+                    continue
+                entries.append((words[0], words[1]))
+
+        self._preload_total = len(entries)
+        self._preload_done = 0
+        self._preload_start_time = time.perf_counter()
+        self._preload_thread = threading.Thread(target=self._run_preload, args=(entries,), name='ResourceLoader', daemon=True)
+        self._preload_thread.start()
+
+    def _run_preload(self, entries: list[tuple[str, str]]) -> None:
+        for kind, name in entries:
+            asset: pygame.surface.Surface|pygame.mixer.Sound|None = None
+            try:
+                if kind == 'image':
+                    asset = pygame.image.load(os.path.join('images', name))
+                else:
+                    asset = pygame.mixer.Sound(os.path.join('audio', name))
+            except (OSError, pygame.error) as e:
+                # loading it again when it's used will report the error properly
+                self._logger.warning(f'Failed to preload {name}: {e}')
+
+            with self._preload_lock:
+                self._preloaded.append((kind, name, asset))
+
+    # hand over whatever the worker has loaded so far; called by the main thread
+    def update_preload(self) -> None:
+        if len(self._preloaded) == 0:
+            return
+
+        with self._preload_lock:
+            preloaded = self._preloaded
+            self._preloaded = []
+
+        for kind, name, asset in preloaded:
+            # anything that was loaded synchronously in the meantime is kept, so surfaces never change
+            if isinstance(asset, pygame.surface.Surface):
+                if name not in self._image_cache:
+                    self._image_cache.put(name, asset.convert_alpha())
+            elif isinstance(asset, pygame.mixer.Sound):
+                if name not in self._sound_cache:
+                    self._sound_cache.put(name, asset)
+
+        self._preload_done += len(preloaded)
+        if not self.preloading:
+            self._logger.info(f'Preloaded {self._preload_total} assets in {time.perf_counter() - self._preload_start_time:.2f} s')
+
+    # wait for the worker to load the rest of the manifest
+    def finish_preload(self) -> None:
+        if self._preload_thread is None:
+            return
+
+        self._preload_thread.join()
+        self.update_preload()
 
     def load_image(self, name: str) -> pygame.surface.Surface:
         image = self._image_cache.get(name)
         if image is None:
+            if self._atlas is not None and name in self._atlas:
+                image = self._atlas.get(name)
+            else:
+                filename = os.path.join('images', name)
+                self._check_io(filename)
+                image = pygame.image.load(filename).convert_alpha()
+            self._image_cache.put(name, image)
+
+        return image
+
+    # hex SHA-1 of an image file, for keying images derived from it in the disk cache
+    def image_digest(self, name: str) -> str:
+        digest = self._image_digests.get(name)
+        if digest is None:
             filename = os.path.join('images', name)
-            image = pygame.image.load(filename).convert_alpha()
-            self._image_cache[name] = image
+            self._check_io(filename)
+            with open(filename, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self._image_digests[name] = digest
+
+        return digest
+
+    # Loads an image that was generated by create() on an earlier run from the disk cache,
+    # or creates and stores it if it isn't there. The cache name must change whenever
+    # create() would give a different image, e.g. by including image_digest() of its source.
+    def load_cached_image(self, cache_name: str, create: Callable[[], pygame.surface.Surface]) -> pygame.surface.Surface:
+        filename = os.path.join(self._cache_dir, 'images', cache_name)
+        self._check_io(filename)
+        if os.path.exists(filename):
+            try:
+                return pygame.image.load(filename).convert_alpha()
+            except pygame.error as e:
+                self._logger.warning(f'Failed to load cached image {filename}: {e}')
+
+        image = create()
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            # save under a temporary name first so an interrupted write never leaves a broken cache entry
+            root, ext = os.path.splitext(filename)
+            temp_filename = f'{root}.tmp{ext}'
+            pygame.image.save(image, temp_filename)
+            os.replace(temp_filename, filename)
+        except (OSError, pygame.error) as e:
+            self._logger.warning(f'Failed to cache image {filename}: {e}')
 
         return image
 
@@ -19,7 +276,44 @@ class ResourceLoader:
         sound = self._sound_cache.get(name)
         if sound is None:
             filename = os.path.join('audio', name)
+            self._check_io(filename)
             sound = pygame.mixer.Sound(filename)
-            self._sound_cache[name] = sound
+            self._sound_cache.put(name, sound)
 
         return sound
+
+    def load_ship_layout(self, name: str) -> ShipLayout:
+        layout = self._ship_layout_cache.get(name)
+        if layout is None:
+            filename = os.path.join('ships', name)
+            self._check_io(filename)
+            layout = load_layout(filename, self._cache_dir)
+            self._ship_layout_cache[name] = layout
+
+        return layout
+
+    def rotate(self, image: pygame.surface.Surface, angle: float) -> pygame.surface.Surface:
+        return self._rotation_cache.rotate(image, angle)
+
+    # the collision mask for an image, or for the image as returned by rotate() if an angle is given
+    def get_mask(self, image: pygame.surface.Surface, angle: float|None=None) -> pygame.mask.Mask:
+        if angle is not None:
+            return self._rotation_cache.mask(image, angle)
+
+        entry = self._mask_cache.get(id(image))
+        if entry is None:
+            entry = (image, pygame.mask.from_surface(image))
+            self._mask_cache.put(id(image), entry)
+
+        return entry[1]
+
+    # Font.render, but text that was rendered before is reused. The surface is shared, so it
+    # mustn't be modified.
+    def render_text(self, font: pygame.font.Font, text: str, antialias: bool, color: pygame.color.Color|tuple[int, int, int]) -> pygame.surface.Surface:
+        key = (id(font), text, antialias, tuple(pygame.color.Color(color)))
+        entry = self._text_cache.get(key)
+        if entry is None:
+            entry = (font, font.render(text, antialias, color))
+            self._text_cache.put(key, entry)
+
+        return entry[1]
@@ -0,0 +1,91 @@
+import pygame
+
+from asset_cache import AssetCache, mask_bytes, surface_bytes
+
+class _RotationEntry:
+    def __init__(self, source: pygame.surface.Surface, rotated: pygame.surface.Surface):
+        # the source surface is kept so its id can't be reused by another surface while the entry exists
+        self.source = source
+        self.rotated = rotated
+        self.mask: pygame.mask.Mask|None = None
+
+    def num_bytes(self) -> int:
+        num_bytes = surface_bytes(self.rotated)
+        if self.mask is not None:
+            num_bytes += mask_bytes(self.mask)
+        return num_bytes
+
+# Caches rotated copies of surfaces (and their collision masks) so sprites that are
+# rotated every frame or created often at arbitrary angles don't pay for
+# pygame.transform.rotate and pygame.mask.from_surface each time. Angles are
+# quantized to ANGLE_STEP degrees and the least recently used rotations are
+# evicted once the cache holds more than max_bytes of pixels and masks.
+class RotationCache:
+    ANGLE_STEP = 1.0 # degrees
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_bytes: int=DEFAULT_MAX_BYTES):
+        self._num_steps = round(360.0 / RotationCache.ANGLE_STEP)
+
+        # keyed by (id of source surface, angle step)
+        self._entries: AssetCache[tuple[int, int], _RotationEntry] = AssetCache('Rotations', _RotationEntry.num_bytes, max_bytes)
+
+    @property
+    def cache(self) -> AssetCache[tuple[int, int], _RotationEntry]:
+        return self._entries
+
+    @property
+    def num_bytes(self) -> int:
+        return self._entries.num_bytes
+
+    @property
+    def max_bytes(self) -> int|None:
+        return self._entries.max_bytes
+
+    @property
+    def hits(self) -> int:
+        return self._entries.hits
+
+    @property
+    def misses(self) -> int:
+        return self._entries.misses
+
+    @property
+    def evictions(self) -> int:
+        return self._entries.evictions
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _key(self, surface: pygame.surface.Surface, angle: float) -> tuple[int, int]:
+        step = round(angle / RotationCache.ANGLE_STEP) % self._num_steps
+        return (id(surface), step)
+
+    def _get_entry(self, surface: pygame.surface.Surface, angle: float) -> _RotationEntry:
+        key = self._key(surface, angle)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _RotationEntry(surface, pygame.transform.rotate(surface, key[1] * RotationCache.ANGLE_STEP))
+            self._entries.put(key, entry)
+
+        return entry
+
+    def rotate(self, surface: pygame.surface.Surface, angle: float) -> pygame.surface.Surface:
+        return self._get_entry(surface, angle).rotated
+
+    # the collision mask of the rotated surface, built the first time it's asked for
+    def mask(self, surface: pygame.surface.Surface, angle: float) -> pygame.mask.Mask:
+        entry = self._get_entry(surface, angle)
+        if entry.mask is None:
+            entry.mask = pygame.mask.from_surface(entry.rotated)
+            self._entries.update_size(self._key(surface, angle))
+
+        return entry.mask
+
+    # rotate a surface to every angle step up front so it never misses during play
+    def prewarm(self, surface: pygame.surface.Surface) -> None:
+        for step in range(self._num_steps):
+            self.rotate(surface, step * RotationCache.ANGLE_STEP)
+
+    def clear(self) -> None:
+        self._entries.clear()
@@ -9,7 +9,10 @@ from animation import ShipExplosionAnimation
 from door import Door
 from laser import Laser
 from person import Person
+from ship_layout import ConsoleType, ShipLayout
 from sprite import FlightCollisionSprite, Sprite
+from static_grid import StaticRectGrid
+from stopwatch import timed
 
 if TYPE_CHECKING:
     from game import Game
@@ -19,7 +22,6 @@ class Console(Sprite):
         super().__init__(image)
         self.dirty = 1
         game.interior_view_sprites.add(self)
-        game.interior_solid_sprites.add(self)
 
         self._person: Person|None = None
 
@@ -193,18 +195,22 @@ class WeaponSystemConsole(Console):
         self.dirty = 1
 
 class Ship(FlightCollisionSprite):
-    MAX_ACCELERATION = 5.0
+    MAX_ACCELERATION = 300.0 # pixels/second^2
     LASER_DELAY = 0.5 # seconds
+    INVULNERABLE_HULL = 1_000_000
     FLOOR_COLOR = (180, 180, 180)
     WALL_COLOR = (80, 80, 80)
-    WALL_WIDTH = 10
+    DEFAULT_LAYOUT = 'ship1.layout'
 
-    def __init__(self, game: 'Game', interior_view_center: tuple[int, int]):
+    checks_collisions = True
+
+    def __init__(self, game: 'Game', interior_view_center: tuple[int, int], layout_name: str=DEFAULT_LAYOUT):
         self.game = game
         self._logger = logging.getLogger('Ship')
         flight_view_center = (game.flight_view_size[0] // 2, game.flight_view_size[1] // 2)
+        layout = game.resource_loader.load_ship_layout(layout_name)
 
-        background_image = game.resource_loader.load_image('ship1.png')
+        background_image = game.resource_loader.load_image(layout.image_name)
         self._background_sprite = Sprite(background_image)
         self._background_sprite.rect.center = interior_view_center
 
@@ -220,23 +226,25 @@ class Ship(FlightCollisionSprite):
             0.0,
         )
         self.rect.center = flight_view_center
+        self.mask = game.resource_loader.get_mask(self.image)
         game.flight_view_sprites.add(self)
         game.flight_collision_sprites.add(self)
+        game.flight_bodies.add(self)
 
         # start ship with a small, random velocity
         while (self.dx**2 + self.dy**2)**0.5 < 1.0:
             self.dx = random.random() * 10 - 5
             self.dy = random.random() * 10 - 5
 
-        self._num_weapons = 2
-        self._laser_fire_timers = [0.0, 0.0]
+        self._num_weapons = layout.num_weapons
+        self._laser_fire_timers = [0.0] * self._num_weapons
         self._hull = 10
 
-        self._floor: list[Sprite] = []
-        self._walls: list[Sprite] = []
+        self._floor: list[pygame.rect.Rect] = []
+        self._walls: list[pygame.rect.Rect] = []
         self._consoles: list[Console] = []
 
-        self._create_interior(interior_view_center)
+        self._create_interior(layout, interior_view_center)
 
         # hull integrity info
         self._status_font = pygame.font.SysFont('Arial', 40)
@@ -252,7 +260,7 @@ class Ship(FlightCollisionSprite):
             (0, 240, 0),
         ]
         for i in range(self._num_weapons):
-            aim_sprite = AimSprite(colors[i], self.rect.center)
+            aim_sprite = AimSprite(self.game, colors[i % len(colors)], self.rect.center)
             self._aiming.append(aim_sprite)
             self._weapon_enabled.append(True)
 
@@ -262,158 +270,44 @@ class Ship(FlightCollisionSprite):
     def num_weapons(self) -> int:
         return self._num_weapons
 
-    def _create_interior(self, interior_view_center: tuple[int, int]) -> None:
-        min_floor_width = 100
-        door_gap = 24
-        door_thickness = Ship.WALL_WIDTH - 2
-
-        floor_surface = pygame.surface.Surface((min_floor_width, min_floor_width)).convert()
-        floor_surface.fill(Ship.FLOOR_COLOR)
-
-        # bridge
-        floor1 = Sprite(floor_surface)
-        floor1.rect.center = (interior_view_center[0], interior_view_center[1] - 200)
-        self._floor.append(floor1)
-
-        floor2 = Sprite(floor_surface)
-        floor2.rect.topleft = (floor1.rect.left, floor1.rect.bottom)
-        self._floor.append(floor2)
-
-        floor3 = Sprite(floor_surface)
-        floor3.rect.topright = (floor2.rect.centerx, floor2.rect.bottom)
-        self._floor.append(floor3)
-
-        floor4 = Sprite(floor_surface)
-        floor4.rect.topleft = (floor2.rect.centerx, floor2.rect.bottom)
-        self._floor.append(floor4)
-
-        floor5 = Sprite(floor_surface)
-        floor5.rect.topleft = (floor3.rect.left, floor3.rect.bottom)
-        self._floor.append(floor5)
-
-        floor6 = Sprite(floor_surface)
-        floor6.rect.topleft = (floor4.rect.left, floor4.rect.bottom)
-        self._floor.append(floor6)
-
-        floor_surface2 = pygame.surface.Surface((min_floor_width*2, min_floor_width)).convert()
-        floor_surface2.fill(Ship.FLOOR_COLOR)
-
-        floor7 = Sprite(floor_surface2)
-        floor7.rect.topleft = (floor5.rect.left, floor5.rect.bottom)
-        self._floor.append(floor7)
-
-        wall = self._create_wall(min_floor_width + Ship.WALL_WIDTH*2, Ship.WALL_WIDTH)
-        wall.rect.bottomleft = (floor1.rect.left - Ship.WALL_WIDTH, floor1.rect.top)
-
-        wall = self._create_wall(min_floor_width - door_gap*2, Ship.WALL_WIDTH)
-        wall.rect.centerx = floor2.rect.centerx
-        wall.rect.bottom = floor2.rect.bottom
-
-        wall = self._create_wall(Ship.WALL_WIDTH, min_floor_width*2)
-        wall.rect.topright = (floor1.rect.left, floor1.rect.top)
-
-        wall = self._create_wall(Ship.WALL_WIDTH, min_floor_width*2)
-        wall.rect.topleft = (floor1.rect.right, floor1.rect.top)
-
-        wall = self._create_wall((min_floor_width - door_gap)//2, Ship.WALL_WIDTH)
-        wall.rect.topleft = (floor1.rect.left, floor1.rect.bottom - Ship.WALL_WIDTH//2)
-
-        wall = self._create_wall((min_floor_width - door_gap)//2, Ship.WALL_WIDTH)
-        wall.rect.topright = (floor1.rect.right, floor1.rect.bottom - Ship.WALL_WIDTH//2)
-
-        wall = self._create_wall(min_floor_width//2 - Ship.WALL_WIDTH, Ship.WALL_WIDTH)
-        wall.rect.bottomleft = floor3.rect.topleft
-
-        wall = self._create_wall(min_floor_width//2 - Ship.WALL_WIDTH, Ship.WALL_WIDTH)
-        wall.rect.bottomright = floor4.rect.topright
-
-        wall = self._create_wall(Ship.WALL_WIDTH, min_floor_width*3 + Ship.WALL_WIDTH*2)
-        wall.rect.topright = (floor3.rect.left, floor3.rect.top - Ship.WALL_WIDTH)
-
-        wall = self._create_wall(Ship.WALL_WIDTH, min_floor_width*3 + Ship.WALL_WIDTH*2)
-        wall.rect.topleft = (floor4.rect.right, floor4.rect.top - Ship.WALL_WIDTH)
-
-        wall = self._create_wall(Ship.WALL_WIDTH, min_floor_width*2 - Ship.WALL_WIDTH//2 - door_gap)
-        wall.rect.centerx = floor3.rect.right
-        wall.rect.top = floor3.rect.top
+    def _create_interior(self, layout: ShipLayout, interior_view_center: tuple[int, int]) -> None:
+        center_x, center_y = interior_view_center
 
-        wall = self._create_wall(min_floor_width*2 - door_gap*2, Ship.WALL_WIDTH)
-        wall.rect.center = floor3.rect.bottomright
+        for x, y, width, height in layout.floors:
+            self._floor.append(pygame.rect.Rect(center_x + x, center_y + y, width, height))
 
-        wall = self._create_wall(min_floor_width*2 - door_gap*2, Ship.WALL_WIDTH)
-        wall.rect.center = floor5.rect.bottomright
+        for x, y, width, height in layout.walls:
+            self._walls.append(pygame.rect.Rect(center_x + x, center_y + y, width, height))
 
-        wall = self._create_wall(min_floor_width*2, Ship.WALL_WIDTH)
-        wall.rect.topleft = floor7.rect.bottomleft
+        for orientation, x, y, gap_len, thickness in layout.doors:
+            door = Door(self.game, orientation, gap_len, thickness)
+            door.rect.topleft = (center_x + x, center_y + y)
 
-        for wall in self._walls:
-            self.game.interior_solid_sprites.add(wall)
-
-        door1 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door1.rect.center = (floor1.rect.centerx, floor1.rect.bottom)
-
-        door2 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door2.rect.bottomleft = (floor2.rect.left, floor2.rect.bottom - 1)
-
-        door3 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door3.rect.bottomright = (floor2.rect.right, floor2.rect.bottom - 1)
-
-        door4 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door4.rect.midleft = (floor3.rect.left, floor3.rect.bottom)
-
-        door5 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door5.rect.midright = (floor4.rect.right, floor4.rect.bottom)
+        # the layout is validated to have exactly one of each console
+        weapon_consoles: dict[int, WeaponConsole] = {}
+        weapon_system_consoles: dict[int, WeaponSystemConsole] = {}
+        for console_type, weapon_index, x, y in layout.consoles:
+            console: Console
+            if console_type == ConsoleType.Pilot:
+                console = self._pilot_console = PilotConsole(self.game)
+            elif console_type == ConsoleType.Weapon:
+                console = weapon_consoles[weapon_index] = WeaponConsole(self.game, weapon_index)
+            elif console_type == ConsoleType.Engine:
+                console = self._engine_console = EngineConsole(self.game)
+            else:
+                console = weapon_system_consoles[weapon_index] = WeaponSystemConsole(self.game, weapon_index)
 
-        door6 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door6.rect.midleft = (floor5.rect.left, floor5.rect.bottom)
+            console.rect.topleft = (center_x + x, center_y + y)
+            self._consoles.append(console)
 
-        door7 = Door(self.game, Door.Orientation.Horizontal, door_gap, door_thickness)
-        door7.rect.midright = (floor6.rect.right, floor6.rect.bottom)
+        self._weapon_consoles = [weapon_consoles[i] for i in range(self._num_weapons)]
+        self._weapon_system_consoles = [weapon_system_consoles[i] for i in range(self._num_weapons)]
 
-        door8 = Door(self.game, Door.Orientation.Vertical, door_gap, door_thickness)
-        door8.rect.midbottom = (floor5.rect.right, floor5.rect.bottom - Ship.WALL_WIDTH//2)
-
-        # pilot console
-        self._pilot_console = PilotConsole(self.game)
-        self._pilot_console.rect.centerx = floor1.rect.centerx
-        self._pilot_console.rect.top = floor1.rect.top
-        self._consoles.append(self._pilot_console)
-
-        # weapon consoles
-        self._weapon_consoles: list[WeaponConsole] = []
-        top = floor1.rect.top + 25
-        for i in range(self._num_weapons):
-            weapon_console = WeaponConsole(self.game, i)
-            weapon_console.rect.left = floor1.rect.left
-            weapon_console.rect.top = top
-            self._weapon_consoles.append(weapon_console)
-            self._consoles.append(weapon_console)
-            top += 35
-
-        self._engine_console = EngineConsole(self.game)
-        self._engine_console.rect.centerx = floor7.rect.centerx
-        self._engine_console.rect.bottom = floor7.rect.bottom
-        self._consoles.append(self._engine_console)
-
-        self._weapon_system_consoles: list[WeaponSystemConsole] = []
-        left = floor6.rect.left + Ship.WALL_WIDTH//2
-        for i in range(self._num_weapons):
-            weapon_system_console = WeaponSystemConsole(self.game, i)
-            weapon_system_console.rect.left = left
-            weapon_system_console.rect.top = floor6.rect.top + Ship.WALL_WIDTH//2
-            self._weapon_system_consoles.append(weapon_system_console)
-            self._consoles.append(weapon_system_console)
-            left = weapon_system_console.rect.right
-
-    def _create_wall(self, width: int, height: int) -> Sprite:
-        surface = pygame.surface.Surface((width, height)).convert()
-        surface.fill(Ship.WALL_COLOR)
-        wall = Sprite(surface)
-        self._walls.append(wall)
-        return wall
+        # walls and consoles never move, so people only need to look them up in a grid
+        self._interior_grid = StaticRectGrid(self._walls + [console.rect for console in self._consoles])
 
     def _update_hull_info(self):
-        self._hull_text.image = self._status_font.render(f'Hull: {self._hull}', True, (252, 10, 30))
+        self._hull_text.image = self.game.resource_loader.render_text(self._status_font, f'Hull: {self._hull}', True, (252, 10, 30))
         self._hull_text.rect.bottomleft = (10, self.game.interior_view_size[1] - 10)
         self._hull_text.dirty = 1
 
@@ -423,14 +317,19 @@ class Ship(FlightCollisionSprite):
     def get_weapon_enabled(self, weapon_index: int) -> bool:
         return self._weapon_enabled[weapon_index]
 
+    @property
+    def interior_grid(self) -> StaticRectGrid:
+        return self._interior_grid
+
+    # the floor and walls are drawn once into the static background of the interior view
     def blit_interior_view(self, surface: pygame.surface.Surface) -> None:
         surface.blit(self._background_sprite.image, self._background_sprite.rect)
 
         for floor in self._floor:
-            surface.blit(floor.image, floor.rect)
+            surface.fill(Ship.FLOOR_COLOR, floor)
 
         for wall in self._walls:
-            surface.blit(wall.image, wall.rect)
+            surface.fill(Ship.WALL_COLOR, wall)
 
     def try_activate_console(self, person: 'Person') -> bool:
         for console in self._consoles:
@@ -449,8 +348,8 @@ class Ship(FlightCollisionSprite):
 
     def accelerate(self, x_accel: float, y_accel: float) -> None:
         if self._engine_enabled:
-            self.dx += x_accel
-            self.dy += y_accel
+            self.dx += x_accel * self.game.frame_time
+            self.dy += y_accel * self.game.frame_time
 
     def enable_engine(self) -> None:
         self._engine_enabled = True
@@ -485,13 +384,19 @@ class Ship(FlightCollisionSprite):
     def set_aim_angle(self, weapon_index: int, angle: float) -> None:
         self._aiming[weapon_index].angle = angle
 
+    # lets every weapon fire again right away, for scripted runs like the benchmarks
+    def reset_weapon_cooldowns(self) -> None:
+        for i in range(len(self._laser_fire_timers)):
+            self._laser_fire_timers[i] = 0.0
+
     def fire_laser(self, weapon_index: int) -> None:
         if self._weapon_enabled[weapon_index]:
             if self._laser_fire_timers[weapon_index] <= 0.0:
                 angle = self._aiming[weapon_index].angle
-                Laser(self.game, self.rect.center, angle, self)
+                Laser.fire(self.game, self.rect.center, angle, self)
                 self._laser_fire_timers[weapon_index] = Ship.LASER_DELAY
 
+    @timed('Ship.update')
     def update(self, game: 'Game') -> None:
         for i in range(len(self._laser_fire_timers)):
             self._laser_fire_timers[i] = max(0.0, self._laser_fire_timers[i] - game.frame_time)
@@ -499,32 +404,9 @@ class Ship(FlightCollisionSprite):
         for console in self._consoles:
             console.update_ship(game, self)
 
-        self.x += self.dx * game.frame_time
-        self.y += self.dy * game.frame_time
-
-        self.rect.center = (int(self.x), int(self.y))
-
-        # wrap around if the ship goes past the top or bottom of the screen
-        if self.rect.top >= game.flight_view_size[1]:
-            self.rect.bottom = 0
-            self.y = float(self.rect.centery)
-        elif self.rect.bottom <= 0:
-            self.rect.top = game.flight_view_size[1]
-            self.y = float(self.rect.centery)
-
-        # wrap around if the ship goes past the left or right of the screen
-        if self.rect.left >= game.flight_view_size[0]:
-            self.rect.right = 0
-            self.x = float(self.rect.centerx)
-        elif self.rect.right <= 0:
-            self.rect.left = game.flight_view_size[0]
-            self.x = float(self.rect.centerx)
-
         for aiming in self._aiming:
             aiming.origin = self.rect.center
 
-        self.check_collision(game)
-
     @override
     def on_collide(self, game: 'Game', new_dx: float, new_dy: float, force: float) -> None:
         self.dx = new_dx
@@ -551,6 +433,11 @@ class Ship(FlightCollisionSprite):
             if self._hull <= 0:
                 self.destroy()
 
+    # keeps the ship alive however much it's hit, so scripted runs don't end early
+    def set_invulnerable(self) -> None:
+        self._hull = Ship.INVULNERABLE_HULL
+        self._update_hull_info()
+
     def destroy(self) -> None:
         # remove graphics
         for i in range(len(self._aiming)):
@@ -0,0 +1,266 @@
+from enum import Enum, unique
+import hashlib
+import logging
+import os
+import struct
+
+from door import Door
+
+# Ship interiors are described by a text layout file (see ships/ship1.layout), which
+# is parsed and validated once and then stored in a compact binary form in the cache
+# directory. The cached copy is used as long as the digest of the text file matches.
+#
+# Binary layout (little endian):
+#   header:   magic, version, SHA-1 of the text file, image name length, number of weapons,
+#             number of floors, walls, doors and consoles
+#   image:    image name, UTF-8
+#   floors:   rect records
+#   walls:    rect records
+#   doors:    door records
+#   consoles: console records
+
+MAGIC = b'G5SL'
+VERSION = 1
+
+HEADER_STRUCT = struct.Struct('<4sH20sBBHHHH')
+RECT_STRUCT = struct.Struct('<hhHH')
+DOOR_STRUCT = struct.Struct('<BhhHH')
+CONSOLE_STRUCT = struct.Struct('<BBhh')
+
+MIN_COORDINATE = -32768
+MAX_COORDINATE = 32767
+MAX_SIZE = 65535
+MAX_WEAPONS = 255
+
+@unique
+class ConsoleType(Enum):
+    Pilot = 0
+    Weapon = 1
+    Engine = 2
+    WeaponSystem = 3
+
+_CONSOLE_TYPE_NAMES = {
+    'pilot': ConsoleType.Pilot,
+    'weapon': ConsoleType.Weapon,
+    'engine': ConsoleType.Engine,
+    'weapon_system': ConsoleType.WeaponSystem,
+}
+
+_ORIENTATION_NAMES = {
+    'horizontal': Door.Orientation.Horizontal,
+    'vertical': Door.Orientation.Vertical,
+}
+
+# Rects are (x, y, width, height) with x and y relative to the center of the ship image.
+# Pilot and engine consoles always have a weapon index of 0.
+class ShipLayout:
+    def __init__(self):
+        self.image_name = ''
+        self.num_weapons = 0
+        self.floors: list[tuple[int, int, int, int]] = []
+        self.walls: list[tuple[int, int, int, int]] = []
+        self.doors: list[tuple[Door.Orientation, int, int, int, int]] = [] # orientation, x, y, gap length, thickness
+        self.consoles: list[tuple[ConsoleType, int, int, int]] = [] # type, weapon index, x, y
+
+def _parse_int(filename: str, line_number: int, text: str, min_value: int, max_value: int) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        raise ValueError(f'{filename}:{line_number}: "{text}" is not an integer') from None
+
+    if value < min_value or value > max_value:
+        raise ValueError(f'{filename}:{line_number}: {value} is not between {min_value} and {max_value}')
+
+    return value
+
+def _parse_rect(filename: str, line_number: int, args: list[str]) -> tuple[int, int, int, int]:
+    if len(args) != 4:
+        raise ValueError(f'{filename}:{line_number}: expected x, y, width and height')
+
+    return (
+        _parse_int(filename, line_number, args[0], MIN_COORDINATE, MAX_COORDINATE),
+        _parse_int(filename, line_number, args[1], MIN_COORDINATE, MAX_COORDINATE),
+        _parse_int(filename, line_number, args[2], 1, MAX_SIZE),
+        _parse_int(filename, line_number, args[3], 1, MAX_SIZE),
+    )
+
+def parse_layout(filename: str, text: str) -> ShipLayout:
+    layout = ShipLayout()
+    has_image = False
+    has_weapons = False
+    # line number of each console, to report where a duplicate was found
+    console_lines: dict[tuple[ConsoleType, int], int] = {}
+
+    for line_number, line in enumerate(text.splitlines(), 1):
+        words = line.split('#', 1)[0].split()
+        if len(words) == 0:
+            continue
+
+        keyword, args = words[0], words[1:]
+        if keyword == 'image':
+            if has_image:
+                raise ValueError(f'{filename}:{line_number}: image is given more than once')
+            if len(args) != 1:
+                raise ValueError(f'{filename}:{line_number}: expected an image name')
+            layout.image_name = args[0]
+            has_image = True
+        elif keyword == 'weapons':
+            if has_weapons:
+                raise ValueError(f'{filename}:{line_number}: weapons is given more than once')
+            if len(args) != 1:
+                raise ValueError(f'{filename}:{line_number}: expected the number of weapons')
+            layout.num_weapons = _parse_int(filename, line_number, args[0], 0, MAX_WEAPONS)
+            has_weapons = True
+        elif keyword == 'floor':
+            layout.floors.append(_parse_rect(filename, line_number, args))
+        elif keyword == 'wall':
+            layout.walls.append(_parse_rect(filename, line_number, args))
+        elif keyword == 'door':
+            if len(args) != 5:
+                raise ValueError(f'{filename}:{line_number}: expected orientation, x, y, gap length and thickness')
+            orientation = _ORIENTATION_NAMES.get(args[0])
+            if orientation is None:
+                raise ValueError(f'{filename}:{line_number}: unknown door orientation "{args[0]}"')
+            x, y, gap_len, thickness = _parse_rect(filename, line_number, args[1:])
+            layout.doors.append((orientation, x, y, gap_len, thickness))
+        elif keyword == 'console':
+            if len(args) == 0 or args[0] not in _CONSOLE_TYPE_NAMES:
+                raise ValueError(f'{filename}:{line_number}: expected a console type ({", ".join(_CONSOLE_TYPE_NAMES)})')
+            console_type = _CONSOLE_TYPE_NAMES[args[0]]
+            args = args[1:]
+
+            weapon_index = 0
+            if console_type in (ConsoleType.Weapon, ConsoleType.WeaponSystem):
+                if len(args) != 3:
+                    raise ValueError(f'{filename}:{line_number}: expected weapon index, x and y')
+                weapon_index = _parse_int(filename, line_number, args[0], 0, MAX_WEAPONS - 1)
+                args = args[1:]
+            elif len(args) != 2:
+                raise ValueError(f'{filename}:{line_number}: expected x and y')
+
+            x = _parse_int(filename, line_number, args[0], MIN_COORDINATE, MAX_COORDINATE)
+            y = _parse_int(filename, line_number, args[1], MIN_COORDINATE, MAX_COORDINATE)
+
+            key = (console_type, weapon_index)
+            if key in console_lines:
+                raise ValueError(f'{filename}:{line_number}: console is already placed on line {console_lines[key]}')
+            console_lines[key] = line_number
+            layout.consoles.append((console_type, weapon_index, x, y))
+        else:
+            raise ValueError(f'{filename}:{line_number}: unknown keyword "{keyword}"')
+
+    _validate_layout(filename, layout, has_image, has_weapons)
+    return layout
+
+def _validate_layout(filename: str, layout: ShipLayout, has_image: bool, has_weapons: bool) -> None:
+    if not has_image:
+        raise ValueError(f'{filename}: no image given')
+    if not has_weapons:
+        raise ValueError(f'{filename}: number of weapons not given')
+    if len(layout.floors) == 0:
+        raise ValueError(f'{filename}: no floor given')
+
+    # every ship needs exactly one of each console, with weapon consoles for each weapon
+    placed = {(console_type, weapon_index) for console_type, weapon_index, _, _ in layout.consoles}
+    required = {(ConsoleType.Pilot, 0), (ConsoleType.Engine, 0)}
+    for i in range(layout.num_weapons):
+        required.add((ConsoleType.Weapon, i))
+        required.add((ConsoleType.WeaponSystem, i))
+
+    for console_type, weapon_index in sorted(required ^ placed, key=lambda key: (key[0].value, key[1])):
+        if (console_type, weapon_index) in placed:
+            raise ValueError(f'{filename}: {console_type.name} console for weapon {weapon_index}, but the ship only has {layout.num_weapons} weapons')
+        elif console_type in (ConsoleType.Weapon, ConsoleType.WeaponSystem):
+            raise ValueError(f'{filename}: missing {console_type.name} console for weapon {weapon_index}')
+        else:
+            raise ValueError(f'{filename}: missing {console_type.name} console')
+
+def _pack_layout(layout: ShipLayout, digest: bytes) -> bytes:
+    image_name = layout.image_name.encode('utf-8')
+    data = bytearray(HEADER_STRUCT.pack(
+        MAGIC,
+        VERSION,
+        digest,
+        len(image_name),
+        layout.num_weapons,
+        len(layout.floors),
+        len(layout.walls),
+        len(layout.doors),
+        len(layout.consoles),
+    ))
+    data += image_name
+    for rect in layout.floors:
+        data += RECT_STRUCT.pack(*rect)
+    for rect in layout.walls:
+        data += RECT_STRUCT.pack(*rect)
+    for orientation, x, y, gap_len, thickness in layout.doors:
+        data += DOOR_STRUCT.pack(orientation.value, x, y, gap_len, thickness)
+    for console_type, weapon_index, x, y in layout.consoles:
+        data += CONSOLE_STRUCT.pack(console_type.value, weapon_index, x, y)
+
+    return bytes(data)
+
+# returns None if the data isn't a cached layout for a text file with the given digest
+def _unpack_layout(data: bytes, digest: bytes) -> ShipLayout|None:
+    if len(data) < HEADER_STRUCT.size:
+        return None
+
+    magic, version, cached_digest, name_len, num_weapons, num_floors, num_walls, num_doors, num_consoles = HEADER_STRUCT.unpack_from(data)
+    if magic != MAGIC or version != VERSION or cached_digest != digest:
+        return None
+
+    expected_size = (HEADER_STRUCT.size + name_len + (num_floors + num_walls) * RECT_STRUCT.size
+                     + num_doors * DOOR_STRUCT.size + num_consoles * CONSOLE_STRUCT.size)
+    if len(data) != expected_size:
+        return None
+
+    layout = ShipLayout()
+    layout.num_weapons = num_weapons
+    offset = HEADER_STRUCT.size
+    layout.image_name = data[offset:offset + name_len].decode('utf-8')
+    offset += name_len
+
+    layout.floors = list(RECT_STRUCT.iter_unpack(data[offset:offset + num_floors * RECT_STRUCT.size]))
+    offset += num_floors * RECT_STRUCT.size
+    layout.walls = list(RECT_STRUCT.iter_unpack(data[offset:offset + num_walls * RECT_STRUCT.size]))
+    offset += num_walls * RECT_STRUCT.size
+
+    for orientation, x, y, gap_len, thickness in DOOR_STRUCT.iter_unpack(data[offset:offset + num_doors * DOOR_STRUCT.size]):
+        layout.doors.append((Door.Orientation(orientation), x, y, gap_len, thickness))
+    offset += num_doors * DOOR_STRUCT.size
+
+    for console_type, weapon_index, x, y in CONSOLE_STRUCT.iter_unpack(data[offset:]):
+        layout.consoles.append((ConsoleType(console_type), weapon_index, x, y))
+
+    return layout
+
+# Loads a layout file, using the preprocessed copy in cache_dir if it's up to date and
+# writing a new one if it isn't. Raises ValueError if the layout file is invalid.
+def load_layout(filename: str, cache_dir: str) -> ShipLayout:
+    logger = logging.getLogger('ShipLayout')
+
+    with open(filename, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha1(source).digest()
+
+    cache_filename = os.path.join(cache_dir, os.path.basename(filename) + '.bin')
+    try:
+        with open(cache_filename, 'rb') as f:
+            layout = _unpack_layout(f.read(), digest)
+        if layout is not None:
+            return layout
+    except FileNotFoundError:
+        pass
+
+    layout = parse_layout(filename, source.decode('utf-8'))
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_filename, 'wb') as f:
+            f.write(_pack_layout(layout, digest))
+        logger.info(f'Cached layout of {filename} in {cache_filename}')
+    except OSError as e:
+        # the game works without the cache, it just has to parse the layout every time
+        logger.warning(f'Failed to cache layout of {filename}: {e}')
+
+    return layout
@@ -0,0 +1,103 @@
+from collections.abc import Callable, Iterator
+import pygame
+
+from sprite import Sprite
+
+CollidedCallback = Callable[[Sprite, Sprite], bool]
+
+# sprite group that also buckets its sprites into a uniform grid so collision
+# queries only need to look at sprites in nearby cells
+class SpatialHashGroup(pygame.sprite.Group):
+    DEFAULT_CELL_SIZE = 128
+
+    def __init__(self, cell_size: int=DEFAULT_CELL_SIZE):
+        super().__init__()
+        self._cell_size = cell_size
+        # dicts are used instead of sets to keep query results in a deterministic order
+        self._cells: dict[tuple[int, int], dict[Sprite, None]] = {}
+        self._sprite_cells: dict[Sprite, tuple[int, int, int, int]] = {}
+
+    @property
+    def cell_size(self) -> int:
+        return self._cell_size
+
+    @property
+    def num_cells(self) -> int:
+        return len(self._cells)
+
+    def _cell_range(self, rect: pygame.rect.Rect) -> tuple[int, int, int, int]:
+        cell_size = self._cell_size
+        # use the last pixel inside the rect so that touching rects don't span an extra cell
+        return (
+            rect.left // cell_size,
+            rect.top // cell_size,
+            (rect.right - 1) // cell_size,
+            (rect.bottom - 1) // cell_size,
+        )
+
+    def _iter_cells(self, cell_range: tuple[int, int, int, int]) -> Iterator[tuple[int, int]]:
+        left, top, right, bottom = cell_range
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                yield (cx, cy)
+
+    def _insert(self, sprite: Sprite, cell_range: tuple[int, int, int, int]) -> None:
+        self._sprite_cells[sprite] = cell_range
+        for cell in self._iter_cells(cell_range):
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                bucket = {}
+                self._cells[cell] = bucket
+            bucket[sprite] = None
+
+    def _remove(self, sprite: Sprite) -> None:
+        cell_range = self._sprite_cells.pop(sprite, None)
+        if cell_range is None:
+            return
+
+        for cell in self._iter_cells(cell_range):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.pop(sprite, None)
+                if len(bucket) == 0:
+                    del self._cells[cell]
+
+    def add_internal(self, sprite, layer=None) -> None:
+        super().add_internal(sprite, layer)
+        self._remove(sprite)
+        self._insert(sprite, self._cell_range(sprite.rect))
+
+    def remove_internal(self, sprite) -> None:
+        super().remove_internal(sprite)
+        self._remove(sprite)
+
+    # update the cells a sprite is in; this must be called whenever the sprite's rect changes
+    def move(self, sprite: Sprite) -> None:
+        old_range = self._sprite_cells.get(sprite)
+        if old_range is None:
+            return
+
+        new_range = self._cell_range(sprite.rect)
+        if new_range != old_range:
+            self._remove(sprite)
+            self._insert(sprite, new_range)
+
+    # get all sprites whose rects overlap the given rect
+    def query(self, rect: pygame.rect.Rect) -> list[Sprite]:
+        found: dict[Sprite, None] = {}
+        for cell in self._iter_cells(self._cell_range(rect)):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                for sprite in bucket:
+                    if sprite not in found and rect.colliderect(sprite.rect):
+                        found[sprite] = None
+
+        return list(found)
+
+    # grid accelerated version of pygame.sprite.spritecollide() (never kills the colliding sprites)
+    def spritecollide(self, sprite: Sprite, collided: CollidedCallback|None=None) -> list[Sprite]:
+        candidates = self.query(sprite.rect)
+        if collided is None:
+            return candidates
+
+        return [s for s in candidates if collided(sprite, s)]
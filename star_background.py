@@ -0,0 +1,141 @@
+import numpy as np
+import pygame
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from resource_loader import ResourceLoader
+
+# Renders the starfield behind the menus and the flight view from a seed. Stars and nebulae
+# are drawn with array operations over all of them at once instead of a blit per star or
+# nebula part.
+
+STAR_COLORS = np.array([
+    (250, 250, 250), # white
+    (255, 255, 180), # yellow
+    (255, 160, 180), # red
+], dtype=np.float32)
+PIXELS_PER_STAR = 5000
+NUM_GALAXY_IMAGES = 2
+NUM_NEBULA_PART_IMAGES = 5
+NUM_NEBULAS = 2
+NEBULA_ALPHA = 130
+
+def draw_stars(pixels: np.ndarray, rng: np.random.Generator, pixels_per_star: int=PIXELS_PER_STAR) -> None:
+    width, height, _ = pixels.shape
+    num_stars = width * height // pixels_per_star
+    num_white_stars = rng.integers(num_stars * 3 // 8, num_stars * 5 // 8, endpoint=True)
+    num_remaining = num_stars - num_white_stars
+    num_yellow_stars = rng.integers(num_remaining * 1 // 2, num_remaining * 5 // 8, endpoint=True)
+    num_red_stars = max(0, num_stars - num_white_stars - num_yellow_stars)
+
+    colors = np.repeat(np.arange(len(STAR_COLORS)), [num_white_stars, num_yellow_stars, num_red_stars])
+    x = rng.integers(0, width, len(colors))
+    y = rng.integers(0, height, len(colors))
+    alpha = rng.integers(60, 255, len(colors), endpoint=True).astype(np.float32) / 255.0
+
+    # the background is black, so blending a star on top of it only scales its color
+    pixels[x, y] = np.rint(STAR_COLORS[colors] * alpha[:, np.newaxis]).astype(np.uint8)
+
+# the galaxies for a background of the given size, with their positions
+def create_galaxies(resource_loader: 'ResourceLoader', size: tuple[int, int], rng: np.random.Generator) -> list[tuple[pygame.surface.Surface, tuple[int, int]]]:
+    width, height = size
+    galaxy_images = [resource_loader.load_image(f'galaxy{i+1}.png') for i in range(NUM_GALAXY_IMAGES)]
+
+    # only a handful of these, so they're simply blitted
+    galaxies: list[tuple[pygame.surface.Surface, tuple[int, int]]] = []
+    num_galaxies = int(rng.choice([2, 3]))
+    for i in range(num_galaxies):
+        x = (width // num_galaxies * i) + int(rng.integers(0, width // num_galaxies, endpoint=True))
+        y = int(rng.integers(50, height - 50, endpoint=True))
+        angle = float(rng.random()) * 40.0 - 20.0
+        # copied, because the loaded image is shared and setting its alpha would change it everywhere
+        galaxy_surface = pygame.transform.rotate(galaxy_images[i % len(galaxy_images)], angle)
+        galaxy_surface.set_alpha(int(rng.integers(100, 200, endpoint=True)))
+        galaxies.append((galaxy_surface, (x, y)))
+
+    return galaxies
+
+# Each nebula is made of a few hundred faint parts, scattered around its center. Instead of
+# blending them one after another, the color is the alpha weighted average of all parts
+# covering a pixel and the coverage is 1 - product of (1 - alpha), which only differs from
+# drawing them in order in how overlapping parts of different colors are mixed.
+def create_nebulas(resource_loader: 'ResourceLoader', size: tuple[int, int], rng: np.random.Generator) -> list[tuple[pygame.surface.Surface, tuple[int, int]]]:
+    width, height = size
+    part_images = [resource_loader.load_image(f'nebula_part{i+1}.png') for i in range(NUM_NEBULA_PART_IMAGES)]
+    part_colors = [pygame.surfarray.array3d(image).astype(np.float32) for image in part_images]
+    part_alphas = [pygame.surfarray.array_alpha(image).astype(np.float32) / 255.0 for image in part_images]
+    pad = max(max(image.get_width(), image.get_height()) for image in part_images)
+
+    nebulas: list[tuple[pygame.surface.Surface, tuple[int, int]]] = []
+    for i in range(NUM_NEBULAS):
+        nebula_width = 100 + int(rng.integers(-20, 20, endpoint=True))
+        nebula_height = 140 + int(rng.integers(-25, 25, endpoint=True))
+        num_parts = (nebula_width * nebula_height) // 50 + int(rng.integers(0, 50, endpoint=True))
+
+        part_indices = rng.integers(0, len(part_images), num_parts)
+        part_surface_alphas = rng.integers(10, 30, num_parts, endpoint=True).astype(np.float32) / 255.0
+        part_x = rng.normal(nebula_width / 2, nebula_width / 6, num_parts)
+        part_y = rng.normal(nebula_height / 2, nebula_height / 6, num_parts)
+
+        # Every pixel of every part is summed into flat arrays with bincount. They're padded on every
+        # side, so parts that stick out of the nebula don't need clipping.
+        padded_width = nebula_width + pad * 2
+        padded_height = nebula_height + pad * 2
+        indices: list[np.ndarray] = []
+        colors: list[np.ndarray] = []
+        alphas: list[np.ndarray] = []
+
+        for image_index in range(len(part_images)):
+            selected = part_indices == image_index
+            if not np.any(selected):
+                continue
+
+            part_width, part_height = part_alphas[image_index].shape
+            left = np.clip((part_x[selected] - part_width / 2).astype(int) + pad, 0, nebula_width + pad)
+            top = np.clip((part_y[selected] - part_height / 2).astype(int) + pad, 0, nebula_height + pad)
+            columns = left[:, np.newaxis, np.newaxis] + np.arange(part_width)[np.newaxis, :, np.newaxis]
+            rows = top[:, np.newaxis, np.newaxis] + np.arange(part_height)[np.newaxis, np.newaxis, :]
+            indices.append((columns * padded_height + rows).ravel())
+
+            alpha = part_alphas[image_index][np.newaxis] * part_surface_alphas[selected][:, np.newaxis, np.newaxis]
+            alphas.append(alpha.ravel())
+            colors.append(np.broadcast_to(part_colors[image_index], alpha.shape + (3,)).reshape(-1, 3))
+
+        index = np.concatenate(indices)
+        alpha = np.concatenate(alphas)
+        color = np.concatenate(colors)
+        num_pixels = padded_width * padded_height
+
+        def accumulate(weights: np.ndarray) -> np.ndarray:
+            total = np.bincount(index, weights, num_pixels).reshape(padded_width, padded_height)
+            return total[pad:pad + nebula_width, pad:pad + nebula_height]
+
+        total_alpha = accumulate(alpha)
+        coverage = -np.expm1(accumulate(np.log1p(-alpha)))
+        scale = coverage / np.maximum(total_alpha, 1e-6)
+        nebula = np.stack([accumulate(alpha * color[:, channel]) * scale for channel in range(3)], axis=-1)
+
+        # the whole nebula rectangle, including its black background, is blended in
+        nebula_surface = pygame.surfarray.make_surface(np.rint(nebula).astype(np.uint8))
+        nebula_surface.set_alpha(NEBULA_ALPHA)
+        x = int(rng.integers(100, width - 100, endpoint=True))
+        y = (height // NUM_NEBULAS * i) + int(rng.integers(100, height // NUM_NEBULAS - 100, endpoint=True))
+        nebulas.append((nebula_surface, (x, y)))
+
+    return nebulas
+
+def create_star_background(resource_loader: 'ResourceLoader', size: tuple[int, int], seed: int) -> pygame.surface.Surface:
+    rng = np.random.default_rng(seed)
+
+    surface = pygame.surface.Surface(size)
+    surface.fill((0, 0, 0))
+
+    # the pixel array locks the surface, so it has to be gone before it's blitted to
+    pixels = pygame.surfarray.pixels3d(surface)
+    draw_stars(pixels, rng)
+    del pixels
+
+    for image, position in create_galaxies(resource_loader, size, rng) + create_nebulas(resource_loader, size, rng):
+        surface.blit(image, position)
+
+    return surface
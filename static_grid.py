@@ -0,0 +1,58 @@
+import pygame
+
+# Uniform grid over a fixed set of rects (walls, consoles, ...) that never move. It's
+# built once, and then collision queries only look at the rects in the cells they
+# overlap, so their cost doesn't grow with the number of rects.
+class StaticRectGrid:
+    DEFAULT_CELL_SIZE = 32
+
+    def __init__(self, rects: list[pygame.rect.Rect], cell_size: int=DEFAULT_CELL_SIZE):
+        self._rects = [rect.copy() for rect in rects]
+        self._cell_size = cell_size
+
+        bounds = pygame.rect.Rect(0, 0, 0, 0)
+        if len(self._rects) > 0:
+            bounds = self._rects[0].unionall(self._rects[1:])
+        self._first_col = bounds.left // cell_size
+        self._first_row = bounds.top // cell_size
+        self._num_cols = max(0, (bounds.right - 1) // cell_size - self._first_col + 1)
+        self._num_rows = max(0, (bounds.bottom - 1) // cell_size - self._first_row + 1)
+
+        # indices into _rects for every cell, in the order the rects were given
+        self._cells: list[list[int]] = [[] for _ in range(self._num_cols * self._num_rows)]
+        for i, rect in enumerate(self._rects):
+            for cell in self._cell_indices(rect):
+                self._cells[cell].append(i)
+
+    @property
+    def rects(self) -> list[pygame.rect.Rect]:
+        return self._rects
+
+    @property
+    def cell_size(self) -> int:
+        return self._cell_size
+
+    @property
+    def num_occupied_cells(self) -> int:
+        return sum(1 for cell in self._cells if len(cell) > 0)
+
+    def _cell_indices(self, rect: pygame.rect.Rect) -> list[int]:
+        cell_size = self._cell_size
+        left = max(rect.left // cell_size - self._first_col, 0)
+        top = max(rect.top // cell_size - self._first_row, 0)
+        right = min((rect.right - 1) // cell_size - self._first_col, self._num_cols - 1)
+        bottom = min((rect.bottom - 1) // cell_size - self._first_row, self._num_rows - 1)
+
+        return [
+            row * self._num_cols + col
+            for row in range(top, bottom + 1)
+            for col in range(left, right + 1)
+        ]
+
+    # the rects that overlap the given rect, in the order they were given to the grid
+    def query(self, rect: pygame.rect.Rect) -> list[pygame.rect.Rect]:
+        found: set[int] = set()
+        for cell in self._cell_indices(rect):
+            found.update(self._cells[cell])
+
+        return [self._rects[i] for i in sorted(found) if rect.colliderect(self._rects[i])]
@@ -1,18 +1,215 @@
-import pygame
+from collections.abc import Callable, Iterator
+import functools
+import time
+from typing import Any, TypeVar
+
+NS_PER_MS = 1_000_000
+
+# histogram bucket upper bounds in ns (the last bucket holds everything slower)
+HISTOGRAM_BOUNDS_NS = [
+    10_000,
+    50_000,
+    100_000,
+    250_000,
+    500_000,
+    1_000_000,
+    2_000_000,
+    4_000_000,
+    8_000_000,
+    16_666_667,
+    33_333_333,
+]
 
 class Stopwatch:
-    def __init__(self, num_frames: int):
-        self._times = [0] * num_frames
+    def __init__(self, registry: 'StopwatchRegistry', name: str, num_samples: int):
+        self._registry = registry
+        self._name = name
+        self._parent: Stopwatch|None = None
+        self._children: list[Stopwatch] = []
+        self._placed = False
+
+        # ring buffer of per-frame totals in ns
+        self._samples = [0] * num_samples
+        self._next_index = 0
+        self._num_samples = 0
+
         self._start = 0
+        self._frame_total = 0
+        self._frame_calls = 0
+        self._last_calls = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def parent(self) -> 'Stopwatch|None':
+        return self._parent
+
+    @property
+    def children(self) -> list['Stopwatch']:
+        return self._children
 
     @property
     def times(self) -> list[int]:
-        return self._times
+        # samples in the order they were recorded
+        if self._num_samples < len(self._samples):
+            return self._samples[:self._num_samples]
+        return self._samples[self._next_index:] + self._samples[:self._next_index]
+
+    @property
+    def last_ns(self) -> int:
+        # 0 if the stopwatch didn't run in the last frame
+        if self._last_calls == 0:
+            return 0
+        return self._samples[self._next_index - 1]
+
+    @property
+    def last_calls(self) -> int:
+        return self._last_calls
 
     def start(self) -> None:
-        self._start = pygame.time.get_ticks()
+        self._registry._push(self)
+        self._start = time.perf_counter_ns()
 
     def stop(self) -> None:
-        time = pygame.time.get_ticks() - self._start
-        self._times.append(time)
-        self._times.pop(0)
+        self._frame_total += time.perf_counter_ns() - self._start
+        self._frame_calls += 1
+        self._registry._pop(self)
+
+    def __enter__(self) -> 'Stopwatch':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # Frames in which a stopwatch didn't run aren't sampled: updates run at a fixed tick rate,
+    # so most rendered frames don't update anything, and zeros would drag the statistics down.
+    def _end_frame(self) -> None:
+        self._last_calls = self._frame_calls
+        if self._frame_calls == 0:
+            return
+
+        self._samples[self._next_index] = self._frame_total
+        self._next_index = (self._next_index + 1) % len(self._samples)
+        self._num_samples = min(self._num_samples + 1, len(self._samples))
+
+        self._frame_total = 0
+        self._frame_calls = 0
+
+    def mean_ns(self) -> float:
+        if self._num_samples == 0:
+            return 0.0
+        return sum(self.times) / self._num_samples
+
+    def percentiles_ns(self, percents: list[float]) -> list[int]:
+        if self._num_samples == 0:
+            return [0] * len(percents)
+
+        # sort once for all the requested percentiles
+        sorted_times = sorted(self.times)
+        last_index = len(sorted_times) - 1
+        return [sorted_times[min(last_index, int(p / 100 * len(sorted_times)))] for p in percents]
+
+    def histogram(self) -> list[int]:
+        counts = [0] * (len(HISTOGRAM_BOUNDS_NS) + 1)
+        for t in self.times:
+            i = 0
+            while i < len(HISTOGRAM_BOUNDS_NS) and t > HISTOGRAM_BOUNDS_NS[i]:
+                i += 1
+            counts[i] += 1
+        return counts
+
+class StopwatchRegistry:
+    DEFAULT_NUM_SAMPLES = 300
+
+    def __init__(self, num_samples: int=DEFAULT_NUM_SAMPLES):
+        self._num_samples = num_samples
+        self._stopwatches: dict[str, Stopwatch] = {}
+        self._roots: list[Stopwatch] = []
+        self._active: list[Stopwatch] = []
+
+    @property
+    def num_samples(self) -> int:
+        return self._num_samples
+
+    def get(self, name: str) -> Stopwatch:
+        stopwatch = self._stopwatches.get(name)
+        if stopwatch is None:
+            stopwatch = Stopwatch(self, name, self._num_samples)
+            self._stopwatches[name] = stopwatch
+        return stopwatch
+
+    def _push(self, stopwatch: Stopwatch) -> None:
+        # a stopwatch's parent is whatever was running the first time it was started
+        if not stopwatch._placed:
+            stopwatch._placed = True
+            if len(self._active) > 0:
+                stopwatch._parent = self._active[-1]
+                stopwatch._parent._children.append(stopwatch)
+            else:
+                self._roots.append(stopwatch)
+
+        self._active.append(stopwatch)
+
+    def _pop(self, stopwatch: Stopwatch) -> None:
+        assert len(self._active) > 0 and self._active[-1] is stopwatch, f'Stopwatch "{stopwatch.name}" stopped out of order'
+        self._active.pop()
+
+    def end_frame(self) -> None:
+        for stopwatch in self._stopwatches.values():
+            stopwatch._end_frame()
+
+    # depth-first walk of the stopwatches that have been used, with their nesting depth
+    def walk(self) -> Iterator[tuple[Stopwatch, int]]:
+        stack = [(s, 0) for s in reversed(self._roots)]
+        while len(stack) > 0:
+            stopwatch, depth = stack.pop()
+            yield stopwatch, depth
+            stack += [(s, depth + 1) for s in reversed(stopwatch.children)]
+
+    def dump(self, filename: str) -> None:
+        with open(filename, 'w') as f:
+            f.write(f'Timings for the last {self._num_samples} frames in which each stopwatch ran (ms)\n\n')
+
+            for stopwatch, depth in self.walk():
+                p50, p95, p99 = (t / NS_PER_MS for t in stopwatch.percentiles_ns([50, 95, 99]))
+                indent = '  ' * depth
+                f.write(f'{indent}{stopwatch.name}: mean: {stopwatch.mean_ns() / NS_PER_MS:.3f}, p50: {p50:.3f}, p95: {p95:.3f}, p99: {p99:.3f}\n')
+
+                lower = 0.0
+                for bound, count in zip(HISTOGRAM_BOUNDS_NS + [None], stopwatch.histogram()):
+                    if bound is None:
+                        label = f'>{lower:.3f}'
+                    else:
+                        label = f'{lower:.3f}-{bound / NS_PER_MS:.3f}'
+                        lower = bound / NS_PER_MS
+                    if count > 0:
+                        f.write(f'{indent}  {label:>15}: {count}\n')
+
+_registry = StopwatchRegistry()
+
+def registry() -> StopwatchRegistry:
+    return _registry
+
+def get_stopwatch(name: str) -> Stopwatch:
+    return _registry.get(name)
+
+FuncType = TypeVar('FuncType', bound=Callable[..., Any])
+
+# decorator that times every call of a function with the named stopwatch
+def timed(name: str) -> Callable[[FuncType], FuncType]:
+    stopwatch = get_stopwatch(name)
+
+    def decorator(func: FuncType) -> FuncType:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            stopwatch.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stopwatch.stop()
+        return wrapper # type: ignore
+
+    return decorator
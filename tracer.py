@@ -0,0 +1,59 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+# Records events in the Chrome trace event format, which can be loaded in
+# chrome://tracing or https://ui.perfetto.dev
+class Tracer:
+    MAX_EVENTS = 5_000_000
+
+    def __init__(self, filename: str):
+        self._filename = filename
+        self._logger = logging.getLogger('Tracer')
+        self._events: list[dict[str, Any]] = []
+        self._pid = os.getpid()
+        self._tid = threading.get_native_id()
+        self._full = False
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def num_events(self) -> int:
+        return len(self._events)
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def _add(self, event: dict[str, Any]) -> None:
+        if len(self._events) >= Tracer.MAX_EVENTS:
+            if not self._full:
+                self._full = True
+                self._logger.warning(f'Trace is full ({Tracer.MAX_EVENTS} events), dropping new events')
+            return
+
+        event['pid'] = self._pid
+        event['tid'] = self._tid
+        self._events.append(event)
+
+    def begin(self, name: str, category: str='game') -> None:
+        self._add({'name': name, 'cat': category, 'ph': 'B', 'ts': Tracer.now() / 1000})
+
+    def end(self, name: str, category: str='game') -> None:
+        self._add({'name': name, 'cat': category, 'ph': 'E', 'ts': Tracer.now() / 1000})
+
+    # an event that has already finished, with times from Tracer.now()
+    def complete(self, name: str, start: int, end: int, category: str='game') -> None:
+        self._add({'name': name, 'cat': category, 'ph': 'X', 'ts': start / 1000, 'dur': (end - start) / 1000})
+
+    def counter(self, name: str, values: dict[str, int|float]) -> None:
+        self._add({'name': name, 'ph': 'C', 'ts': Tracer.now() / 1000, 'args': values})
+
+    def save(self) -> None:
+        with open(self._filename, 'w') as f:
+            json.dump({'traceEvents': self._events, 'displayTimeUnit': 'ms'}, f)